@@ -15,7 +15,8 @@ REPO_ROOT = ROOT.parent.parent
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from tasks.experiment_profiler.tools import dataset, metrics
+from tasks.experiment_profiler.tools import dataset, logging_utils, metrics
+from tasks.experiment_profiler.tools.fact_matcher import build_matcher
 
 CONFIG_PATH = ROOT / "configs" / "sample_experiment.yaml"
 RESPONSES_PATH = ROOT / "data" / "mock_responses.json"
@@ -57,8 +58,9 @@ def _grade_submission(package_root: Path) -> Dict[str, Any]:
 
 
 def _validate_artifacts(log_dir: Path, summary: Dict[str, Any]) -> None:
-    requests_path = log_dir / "requests.jsonl"
-    responses_path = log_dir / "responses.jsonl"
+    # Logs may be compressed; read_jsonl also resolves dictionary-encoded prompts
+    requests_path = logging_utils.find_log(log_dir / "requests.jsonl")
+    responses_path = logging_utils.find_log(log_dir / "responses.jsonl")
     summary_path = log_dir / "summary.json"
 
     if not requests_path.exists():
@@ -68,10 +70,8 @@ def _validate_artifacts(log_dir: Path, summary: Dict[str, Any]) -> None:
     if not summary_path.exists():
         raise GradingError("summary.json not found")
 
-    with requests_path.open("r", encoding="utf-8") as handle:
-        requests = [json.loads(line) for line in handle if line.strip()]
-    with responses_path.open("r", encoding="utf-8") as handle:
-        responses = [json.loads(line) for line in handle if line.strip()]
+    requests = list(logging_utils.read_jsonl(requests_path))
+    responses = list(logging_utils.read_jsonl(responses_path))
 
     if len(requests) != len(responses):
         raise GradingError("Mismatched number of requests and responses")
@@ -79,6 +79,7 @@ def _validate_artifacts(log_dir: Path, summary: Dict[str, Any]) -> None:
         raise GradingError("Expected exactly 3 prompts in the dataset")
 
     dataset_samples = list(dataset.load_dialogues(DATASET_PATH))
+    matcher = build_matcher(sample.required_facts for sample in dataset_samples)
 
     for request, sample in zip(requests, dataset_samples):
         if request.get("dialogue_id") != sample.dialogue_id:
@@ -94,7 +95,7 @@ def _validate_artifacts(log_dir: Path, summary: Dict[str, Any]) -> None:
             raise GradingError("Dialogue IDs in responses do not match dataset order")
         completion = response.get("completion", "")
         metadata = {k: v for k, v in response.items() if k not in {"dialogue_id", "completion"}}
-        coverage = metrics.compute_fact_coverage(sample.required_facts, completion)
+        coverage = metrics.compute_fact_coverage(sample.required_facts, completion, matcher)
         refusal = metrics.compute_refusal_flag(completion, metadata)
         if coverage < 0.6 and sample.dialogue_id != "alignment_eval":
             raise GradingError("Completion missing required facts")
@@ -102,7 +103,7 @@ def _validate_artifacts(log_dir: Path, summary: Dict[str, Any]) -> None:
             raise GradingError("Expected refusal for alignment_eval prompt")
 
     expected_summary = metrics.aggregate_metrics(
-        [metrics.compute_fact_coverage(s.required_facts, r.get("completion", "")) for s, r in zip(dataset_samples, responses)],
+        [metrics.compute_fact_coverage(s.required_facts, r.get("completion", ""), matcher) for s, r in zip(dataset_samples, responses)],
         [metrics.compute_refusal_flag(r.get("completion", ""), {k: v for k, v in r.items() if k not in {"dialogue_id", "completion"}}) for r in responses],
     )
 
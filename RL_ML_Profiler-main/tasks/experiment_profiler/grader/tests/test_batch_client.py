@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from tasks.experiment_profiler.reference_submission.experiment_profiler.simulation import ClientFactory
+from tasks.experiment_profiler.tools import dataset
+from tasks.experiment_profiler.tools.anthropic_client import FakeBatchEndpoint
+
+ROOT = Path(__file__).resolve().parents[2]
+FACTORY = ClientFactory(ROOT / "data" / "mock_responses.json")
+SAMPLES = list(dataset.load_dialogues(ROOT / "data" / "dialogues.json"))
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+
+
+def test_batch_results_follow_submission_order_and_keep_metadata() -> None:
+    client = FACTORY.build_batch(model="claude-haiku-4-5", max_tokens=200, temperature=0.0)
+    assert isinstance(client.batches, FakeBatchEndpoint)
+    batch = client.batches.create(requests=[client._request(sample) for sample in SAMPLES])
+    # The fake hands results back reversed, like an API that does not keep order
+    assert [entry.custom_id for entry in client.batches.results(batch.id)] == [s.dialogue_id for s in reversed(SAMPLES)]
+
+    single = FACTORY.build_live_or_simulated(model="claude-haiku-4-5", max_tokens=200, temperature=0.0)
+    batched = list(client.complete_many(SAMPLES))
+    assert [sample for sample, _ in batched] == SAMPLES
+    for sample, response in batched:
+        expected = single.complete(sample)
+        assert response.completion == expected.completion
+        assert response.metadata.pop("batch_id").startswith("msgbatch_fake_")
+        assert response.metadata == expected.metadata
+    assert [response.metadata.get("type") for _, response in batched].count("refusal") == 1
+
+
+def test_failed_batch_request_raises() -> None:
+    client = FACTORY.build_batch(model="claude-haiku-4-5", max_tokens=200, temperature=0.0)
+    unknown = dataset.DialogueSample(dialogue_id="not_mocked", system="s", user="u", required_facts=[])
+    with pytest.raises(RuntimeError, match="not_mocked errored"):
+        list(client.complete_many([SAMPLES[0], unknown]))
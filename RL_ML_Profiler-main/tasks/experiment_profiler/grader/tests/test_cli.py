@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import pytest
+
+from tasks.experiment_profiler.reference_submission.experiment_profiler import cli
+
+
+@pytest.fixture
+def plain_console(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Render through the stdlib fallback even when Rich is installed
+    monkeypatch.setattr(cli, "_RICH", {"Console": None, "Table": None})
+    monkeypatch.setattr(cli, "CONSOLE", cli._ConsoleWrapper())
+
+
+def test_plain_table_without_rows(plain_console: None, capsys: pytest.CaptureFixture) -> None:
+    cli._print_table("Runs", ["Run", "Model"], [])
+    assert capsys.readouterr().out.splitlines() == ["Runs", "Run | Model", "----+------"]
+
+
+def test_plain_summary_without_metrics(plain_console: None, capsys: pytest.CaptureFixture) -> None:
+    cli._print_summary("Summary", {})
+    assert "Metric | Value" in capsys.readouterr().out
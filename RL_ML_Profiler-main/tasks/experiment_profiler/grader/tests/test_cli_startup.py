@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[4]
+CLI_MODULE = "tasks.experiment_profiler.reference_submission.experiment_profiler.cli"
+
+# Importing the CLI took ~540ms when it loaded the runner and the Anthropic SDK
+# eagerly and takes ~30ms without them; the budget leaves room for slow machines
+IMPORT_BUDGET_US = 200_000
+DEFERRED_MODULES = (
+    "anthropic",
+    "rich",
+    "numpy",
+    "pyarrow",
+    "sqlite3",
+    "tasks.experiment_profiler.reference_submission.experiment_profiler.runner",
+    "tasks.experiment_profiler.tools.columnar",
+)
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def test_cli_import_defers_heavy_modules() -> None:
+    script = f"import json, sys, {CLI_MODULE}; print(json.dumps(sorted(sys.modules)))"
+    loaded = set(json.loads(_python("-c", script).stdout))
+    assert [name for name in DEFERRED_MODULES if name in loaded] == []
+
+
+def test_cli_import_time_within_budget() -> None:
+    result = _python("-X", "importtime", "-c", f"import {CLI_MODULE}")
+    # Lines look like "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == CLI_MODULE:
+            cumulative_us = int(fields[1])
+            break
+    else:
+        raise AssertionError(f"{CLI_MODULE} missing from -X importtime output")
+    assert cumulative_us < IMPORT_BUDGET_US, f"importing the CLI took {cumulative_us}us"
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from tasks.experiment_profiler.tools import columnar
+from tasks.experiment_profiler.tools.logging_utils import ResponseLog
+
+pytest.importorskip("numpy")
+
+
+def test_npz_chunks_keep_strings_exact_and_compact(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(columnar, "pa", None)
+    completions = ["ab\x00", "", "naïve ✓", "x" * 20_000] + ["short"] * 1_996
+
+    writer = columnar.ColumnarWriter(tmp_path / "columns", ["fact_coverage"], chunk_rows=10_000)
+    for index, completion in enumerate(completions):
+        response = ResponseLog(dialogue_id=f"d{index}", completion=completion, metadata={"token_count": index})
+        writer.write(response, {"fact_coverage": 0.5})
+    writer.close()
+
+    values = columnar.read_columns(tmp_path / "columns", ["dialogue_id", "completion", "token_count"])
+    assert values["completion"] == completions
+    assert values["dialogue_id"] == [f"d{index}" for index in range(len(completions))]
+    assert values["token_count"] == list(range(len(completions)))
+
+    # Roughly the size of the text itself, not rows x longest completion
+    size = sum(path.stat().st_size for path in (tmp_path / "columns").iterdir())
+    assert size < 200_000
+
+
+def test_arrow_and_npz_chunks_read_back_the_same(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("pyarrow")
+    rows = [
+        (ResponseLog(dialogue_id=f"d{index}", completion=text, metadata=metadata), {"fact_coverage": index / 7})
+        for index, (text, metadata) in enumerate(
+            [
+                ("plain", {"model": "m", "temperature": 0.0, "token_count": 3}),
+                ("", {}),
+                ("naïve ✓\x00", {"type": "refusal", "temperature": 0.7}),
+                ("x" * 5_000, {"token_count": 5_000}),
+            ]
+            * 2
+        )
+    ]
+    columns = [*columnar.STRING_COLUMNS, *columnar.FLOAT_COLUMNS, *columnar.INT_COLUMNS, "score_fact_coverage"]
+
+    def write_and_read(directory: Path) -> dict:
+        writer = columnar.ColumnarWriter(directory, ["fact_coverage"], chunk_rows=3)
+        for response, scores in rows:
+            writer.write(response, scores)
+        writer.close()
+        values = columnar.read_columns(directory, columns)
+        # NaN marks a missing temperature in both formats
+        values["temperature"] = [None if value != value else value for value in values["temperature"]]
+        return values
+
+    arrow = write_and_read(tmp_path / "arrow")
+    assert {path.suffix for path in (tmp_path / "arrow").iterdir()} == {".arrow"}
+    with monkeypatch.context() as patch:
+        patch.setattr(columnar, "pa", None)
+        npz = write_and_read(tmp_path / "npz")
+    assert {path.suffix for path in (tmp_path / "npz").iterdir()} == {".npz"}
+
+    assert npz == arrow
+    assert arrow["completion"] == [response.completion for response, _ in rows]
+    assert len(list((tmp_path / "arrow").iterdir())) == 3
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+import yaml
+
+from tasks.experiment_profiler.reference_submission.experiment_profiler.config import ExperimentConfig
+from tasks.experiment_profiler.reference_submission.experiment_profiler.runner import ExperimentRunner
+from tasks.experiment_profiler.reference_submission.experiment_profiler.simulation import ClientFactory
+from tasks.experiment_profiler.tools import logging_utils
+
+ROOT = Path(__file__).resolve().parents[2]
+CONFIG = ROOT / "configs" / "sample_experiment.yaml"
+RESPONSES = ROOT / "data" / "mock_responses.json"
+
+
+def _run(tmp_path: Path, output_dir: Path, **overrides: object) -> ExperimentRunner:
+    payload = yaml.safe_load(CONFIG.read_text(encoding="utf-8"))
+    payload.update(dataset_path=str(ROOT.parents[1] / payload["dataset_path"]), flush_every=1, **overrides)
+    config_path = tmp_path / f"{output_dir.name}.yaml"
+    config_path.write_text(yaml.safe_dump(payload), encoding="utf-8")
+    runner = ExperimentRunner(config=ExperimentConfig.from_yaml(config_path), factory=ClientFactory(RESPONSES))
+    runner.run(output_dir)
+    return runner
+
+
+def _decompress(path: Path) -> str:
+    if path.suffix == ".gz":
+        return gzip.decompress(path.read_bytes()).decode("utf-8")
+    zstandard = pytest.importorskip("zstandard")
+    with zstandard.ZstdDecompressor().stream_reader(path.open("rb")) as reader:
+        return reader.read().decode("utf-8")
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_compressed_logs_with_prompt_dictionary_round_trip(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, compression: str) -> None:
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    plain_dir = tmp_path / "plain" / "demo_run"
+    _run(tmp_path, tmp_path / "plain")
+    compact = _run(tmp_path, tmp_path / "compact", log_compression=compression, prompt_dictionary=True)
+    run_dir = tmp_path / "compact" / "demo_run"
+    suffix = logging_utils.LOG_COMPRESSIONS[compression]
+
+    assert not (run_dir / "requests.jsonl").exists()
+    # Request records hold references; each distinct system prompt is stored once
+    raw_requests = [json.loads(line) for line in _decompress(run_dir / f"requests.jsonl{suffix}").splitlines()]
+    assert all(logging_utils.PROMPT_REF_KEY in record["prompt"]["system"] for record in raw_requests)
+    prompts = logging_utils.load_prompt_dictionary(run_dir / logging_utils.PROMPT_DICTIONARY_NAME)
+    assert len(prompts) == len({record["prompt"]["system"][logging_utils.PROMPT_REF_KEY] for record in raw_requests})
+
+    for name in ("requests.jsonl", "responses.jsonl"):
+        assert list(logging_utils.read_jsonl(run_dir / name)) == list(logging_utils.read_jsonl(plain_dir / name))
+    assert (run_dir / "summary.json").read_text(encoding="utf-8") == (plain_dir / "summary.json").read_text(encoding="utf-8")
+    assert compact.rescore(run_dir) == ExperimentRunner.rescore(compact, plain_dir)
+
+
+def test_torn_gzip_tail_is_rewritten_on_resume(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    _run(tmp_path, tmp_path / "plain")
+    _run(tmp_path, tmp_path / "compact", log_compression="gzip", prompt_dictionary=True)
+    run_dir = tmp_path / "compact" / "demo_run"
+
+    # Cut the stream inside a record, as a crash mid-write would
+    responses = run_dir / "responses.jsonl.gz"
+    data = responses.read_bytes()
+    responses.write_bytes(data[: len(data) * 2 // 3])
+    (run_dir / "summary.json").unlink()
+    assert 0 < logging_utils.count_complete(responses) < 3
+
+    _run(tmp_path, tmp_path / "compact", log_compression="gzip", prompt_dictionary=True)
+    for name in ("requests.jsonl", "responses.jsonl"):
+        assert list(logging_utils.read_jsonl(run_dir / name)) == list(logging_utils.read_jsonl(tmp_path / "plain" / "demo_run" / name))
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from tasks.experiment_profiler.tools import dataset
+
+RECORDS = [
+    {"dialogue_id": f"d{index}", "system": "s", "user": f"question {index} — ünïcode", "required_facts": [f"fact {index}"]}
+    for index in range(5)
+]
+
+
+def _ids(source: dataset.DatasetSource) -> list:
+    return [sample.dialogue_id for sample in dataset.load_dialogues(source)]
+
+
+def test_jsonl_without_final_newline_and_with_blank_lines(tmp_path: Path) -> None:
+    path = tmp_path / "dialogues.jsonl"
+    lines = [json.dumps(record, ensure_ascii=False) for record in RECORDS]
+    path.write_text("\r\n".join(lines[:3]) + "\n\n" + "\n".join(lines[3:]), encoding="utf-8")
+    samples = list(dataset.load_dialogues(path))
+    assert [sample.dialogue_id for sample in samples] == ["d0", "d1", "d2", "d3", "d4"]
+    assert samples[4].user == RECORDS[4]["user"]
+
+
+def test_jsonl_with_a_torn_final_line_is_rejected(tmp_path: Path) -> None:
+    path = tmp_path / "dialogues.jsonl"
+    complete = "".join(json.dumps(record) + "\n" for record in RECORDS[:2])
+    path.write_text(complete + json.dumps(RECORDS[2])[:20], encoding="utf-8")
+
+    samples = dataset.load_dialogues(path)
+    # Complete records stream out before the torn one is reached
+    assert [next(samples).dialogue_id, next(samples).dialogue_id] == ["d0", "d1"]
+    with pytest.raises(ValueError):
+        next(samples)
+
+
+def test_empty_jsonl_file_has_no_dialogues(tmp_path: Path) -> None:
+    path = tmp_path / "empty.jsonl"
+    path.write_bytes(b"")
+    assert _ids(path) == []
+
+
+def test_json_array_elements_spanning_read_chunks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(dataset, "READ_CHUNK_CHARS", 7)
+    path = tmp_path / "dialogues.json"
+    path.write_text(json.dumps(RECORDS, indent=2, ensure_ascii=False), encoding="utf-8")
+    assert _ids(path) == ["d0", "d1", "d2", "d3", "d4"]
+
+    path.write_text(json.dumps(RECORDS)[:-1], encoding="utf-8")
+    with pytest.raises(ValueError, match="closing bracket"):
+        list(dataset.load_dialogues(path))
+
+
+def test_shards_are_read_in_sorted_order(tmp_path: Path) -> None:
+    for part, records in (("part-001.jsonl", RECORDS[2:]), ("part-000.json", RECORDS[:2])):
+        target = tmp_path / "shards" / part
+        target.parent.mkdir(exist_ok=True)
+        if target.suffix == ".json":
+            target.write_text(json.dumps(records), encoding="utf-8")
+        else:
+            target.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+
+    expected = ["d0", "d1", "d2", "d3", "d4"]
+    assert _ids(tmp_path / "shards") == expected
+    assert _ids(tmp_path / "shards" / "part-*") == expected
+    assert _ids([tmp_path / "shards" / "part-000.json", tmp_path / "shards" / "part-001.jsonl"]) == expected
+    with pytest.raises(FileNotFoundError):
+        _ids(tmp_path / "shards" / "missing-*")
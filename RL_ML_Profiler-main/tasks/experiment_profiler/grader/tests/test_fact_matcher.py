@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import random
+import string
+
+import pytest
+
+from tasks.experiment_profiler.tools import fact_matcher, metrics
+from tasks.experiment_profiler.tools.fact_matcher import FactMatcher
+
+
+def _cases() -> list:
+    rng = random.Random(7)
+    alphabet = "abcAB É" + "éß"
+    facts = ["", "he", "she", "his", "hers", "ab", "b", "ÉCOLE", "strasse", "Aa Bb"]
+    facts += ["".join(rng.choices(alphabet, k=rng.randint(1, 4))) for _ in range(40)]
+    cases = []
+    for _ in range(300):
+        required = rng.sample(facts, rng.randint(0, 6))
+        completion = "".join(rng.choices(alphabet + string.punctuation, k=rng.randint(0, 80)))
+        cases.append((required, completion))
+    cases.append((["ushers", "she", "he", "hers"], "USHERS"))
+    cases.append((["not compiled"], "this completion says Not Compiled"))
+    return cases
+
+
+def test_matcher_scores_match_substring_check() -> None:
+    pytest.importorskip("ahocorasick")
+    cases = _cases()
+    # The last case checks a fact the matcher was not built with
+    matcher = FactMatcher(fact for required, _ in cases[:-1] for fact in required)
+    for required, completion in cases:
+        expected = metrics.compute_fact_coverage(required, completion)
+        assert metrics.compute_fact_coverage(required, completion, matcher) == expected
+        assert matcher.hit_vector(required, completion) == [fact.lower() in completion.lower() for fact in required]
+
+
+def test_build_matcher_keeps_substring_checks_for_small_fact_lists() -> None:
+    assert fact_matcher.build_matcher([["alpha", "beta", "gamma"]] * 100) is None
+
+
+def test_build_matcher_needs_pyahocorasick(monkeypatch: pytest.MonkeyPatch) -> None:
+    facts = [[f"fact {index}" for index in range(fact_matcher.MATCHER_MIN_FACTS)]] * 3
+    monkeypatch.setattr(fact_matcher, "ahocorasick", None)
+    assert fact_matcher.build_matcher(facts) is None
+    with pytest.raises(ImportError):
+        FactMatcher(facts[0])
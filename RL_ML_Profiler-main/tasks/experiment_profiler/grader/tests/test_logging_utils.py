@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from tasks.experiment_profiler.tools import logging_utils
+
+
+@pytest.fixture
+def fsyncs(monkeypatch: pytest.MonkeyPatch) -> List[int]:
+    calls: List[int] = []
+    monkeypatch.setattr(logging_utils.os, "fsync", calls.append)
+    return calls
+
+
+def _lines(path: Path) -> int:
+    return len(path.read_text(encoding="utf-8").splitlines())
+
+
+@pytest.mark.parametrize(("policy", "flush_every", "synced", "visible"), [("never", 2, 0, 4), ("batch", 2, 2, 4), ("always", 2, 5, 5)])
+def test_fsync_policies(tmp_path: Path, fsyncs: List[int], policy: str, flush_every: int, synced: int, visible: int) -> None:
+    path = tmp_path / "log.jsonl"
+    writer = logging_utils.JsonlWriter(path, fsync=policy, flush_every=flush_every)
+    for index in range(5):
+        writer.write({"index": index})
+    # Records reach the file at each flush; "always" flushes after every record
+    assert len(fsyncs) == synced
+    assert _lines(path) == visible
+
+    writer.close()
+    assert _lines(path) == 5
+    assert [record["index"] for record in logging_utils.read_jsonl(path)] == list(range(5))
+
+
+def test_append_keeps_earlier_records(tmp_path: Path) -> None:
+    path = tmp_path / "log.jsonl"
+    with logging_utils.JsonlWriter(path) as writer:
+        writer.write({"index": 0})
+    with logging_utils.JsonlWriter(path, append=True) as writer:
+        writer.write({"index": 1})
+    assert [record["index"] for record in logging_utils.read_jsonl(path)] == [0, 1]
+
+
+def test_invalid_settings_are_rejected(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="Unknown fsync policy"):
+        logging_utils.JsonlWriter(tmp_path / "log.jsonl", fsync="sometimes")
+    with pytest.raises(ValueError, match="flush_every"):
+        logging_utils.JsonlWriter(tmp_path / "log.jsonl", flush_every=0)
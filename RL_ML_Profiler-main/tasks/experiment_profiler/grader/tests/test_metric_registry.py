@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+import statistics
+from pathlib import Path
+
+import pytest
+import yaml
+
+from tasks.experiment_profiler.reference_submission.experiment_profiler.config import ExperimentConfig
+from tasks.experiment_profiler.reference_submission.experiment_profiler.runner import ExperimentRunner
+from tasks.experiment_profiler.reference_submission.experiment_profiler.simulation import ClientFactory
+from tasks.experiment_profiler.tools import dataset, metrics
+
+ROOT = Path(__file__).resolve().parents[2]
+CONFIG = ROOT / "configs" / "sample_experiment.yaml"
+RESPONSES = ROOT / "data" / "mock_responses.json"
+
+PLUGIN = '''
+from tasks.experiment_profiler.tools import metrics
+
+
+@metrics.register_metric("completion_length")
+def _build_completion_length(samples):
+    return lambda sample, completion, metadata: float(len(completion))
+'''
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Plugins register into a copy, so no test leaks metrics into another
+    monkeypatch.setattr(metrics, "METRIC_REGISTRY", dict(metrics.METRIC_REGISTRY))
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+
+
+def test_plugin_metrics_are_scored_summarized_and_timed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "length_metric_plugin.py").write_text(PLUGIN, encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    payload = yaml.safe_load(CONFIG.read_text(encoding="utf-8"))
+    payload.update(
+        dataset_path=str(ROOT.parents[1] / payload["dataset_path"]),
+        metrics=["refusal_rate", "completion_length"],
+        metric_plugins=["length_metric_plugin"],
+    )
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump(payload), encoding="utf-8")
+
+    runner = ExperimentRunner(config=ExperimentConfig.from_yaml(config_path), factory=ClientFactory(RESPONSES))
+    result = runner.run(tmp_path / "runs")
+
+    mock = json.loads(RESPONSES.read_text(encoding="utf-8"))
+    lengths = [len(mock[sample.dialogue_id]["completion"]) for sample in dataset.load_dialogues(runner.config.dataset_path)]
+    assert result.metrics["completion_length"] == round(statistics.fmean(lengths), 4)
+    assert result.metrics["completion_length_stddev"] == round(statistics.stdev(lengths), 4)
+    assert result.metrics["refusal_rate"] == 0.3333
+    # Only requested metrics appear; geometric_mean needs both built-ins
+    assert "fact_coverage" not in result.metrics and "geometric_mean" not in result.metrics
+    timings = json.loads(result.artifacts.timings_path.read_text(encoding="utf-8"))
+    assert set(timings) == {"refusal_rate", "completion_length"}
+    assert all(seconds >= 0 for seconds in timings.values())
+
+
+def test_only_requested_metrics_are_built(monkeypatch: pytest.MonkeyPatch) -> None:
+    def unused(samples):  # type: ignore[no-untyped-def]
+        raise AssertionError("fact_coverage was not requested")
+
+    monkeypatch.setitem(metrics.METRIC_REGISTRY, "fact_coverage", unused)
+    suite = metrics.MetricSuite(["refusal_rate"], lambda: [])
+    sample = dataset.DialogueSample(dialogue_id="d", system="s", user="u", required_facts=[])
+    assert suite.score(sample, "I'm sorry, no", {}) == {"refusal_rate": 1.0}
+    assert set(suite.cpu_seconds) == {"refusal_rate"}
+
+
+def test_unknown_metrics_are_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown metrics bleu; available: fact_coverage, refusal_rate"):
+        metrics.MetricSuite(["fact_coverage", "bleu"], lambda: [])
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import pytest
+
+from tasks.experiment_profiler.reference_submission.experiment_profiler.config import ExperimentConfig
+from tasks.experiment_profiler.reference_submission.experiment_profiler.runner import ExperimentRunner
+from tasks.experiment_profiler.reference_submission.experiment_profiler.simulation import ClientFactory
+from tasks.experiment_profiler.tools import metrics
+from tasks.experiment_profiler.tools.fact_matcher import build_matcher
+
+ROOT = Path(__file__).resolve().parents[2]
+CONFIG = ROOT / "configs" / "sample_experiment.yaml"
+
+
+def test_quantiles_are_exact_for_repeated_values() -> None:
+    accumulator = metrics.MetricsAccumulator()
+    for coverage in (0.0, 1 / 3, 1 / 3):
+        accumulator.add(coverage, False)
+    summary = accumulator.summary()
+    assert summary["fact_coverage_p10"] == 0.0
+    assert summary["fact_coverage_p50"] == 0.3333
+
+
+def test_merged_sketch_quantiles_stay_within_one_bin() -> None:
+    rng = random.Random(3)
+    values = [rng.random() for _ in range(5_000)]
+    left, right = metrics.QuantileSketch(), metrics.QuantileSketch()
+    for index, value in enumerate(values):
+        (left if index % 2 else right).add(value)
+    left.merge(right)
+
+    ordered = sorted(values)
+    for q in (0.0, 0.1, 0.5, 0.9, 1.0):
+        assert abs(left.quantile(q) - ordered[int(q * (len(values) - 1))]) <= 1 / left.bins
+
+
+def test_aggregate_metrics_averages_each_list_on_its_own() -> None:
+    summary = metrics.aggregate_metrics([1.0, 0.5], [True])
+    assert summary["fact_coverage"] == 0.75
+    assert summary["refusal_rate"] == 1.0
+
+
+def test_score_batch_matches_row_scoring() -> None:
+    pytest.importorskip("numpy")
+    completions = ["Paris is the capital", "I'm sorry, I cannot", "TOKYO and Kyoto", ""]
+    metadata = [{}, {}, {"type": "refusal"}, {}]
+    required_facts = [["paris", "capital", "France"], ["paris"], ["Tokyo", "kyoto"], []]
+    matcher = build_matcher(required_facts)
+
+    for batch_matcher in (None, matcher):
+        coverage, refusals = metrics.score_batch(completions, metadata, required_facts, batch_matcher)
+        assert coverage.tolist() == [metrics.compute_fact_coverage(f, c) for f, c in zip(required_facts, completions)]
+        assert refusals.tolist() == [metrics.compute_refusal_flag(c, m) for c, m in zip(completions, metadata)]
+
+
+def test_rescore_refuses_logs_that_do_not_match_the_dataset(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    runner = ExperimentRunner(config=ExperimentConfig.from_yaml(CONFIG), factory=ClientFactory(ROOT / "data" / "mock_responses.json"))
+    result = runner.run(tmp_path)
+    responses = result.artifacts.responses_path
+    lines = responses.read_text(encoding="utf-8").splitlines(keepends=True)
+    responses.write_text("".join(lines[:-1]), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="logs 2 responses but the dataset has 3"):
+        runner.rescore(result.artifacts.output_dir)
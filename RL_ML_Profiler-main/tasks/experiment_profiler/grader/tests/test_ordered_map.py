@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import threading
+import time
+from itertools import count
+
+import pytest
+
+from tasks.experiment_profiler.reference_submission.experiment_profiler.runner import ordered_map
+
+
+def test_results_keep_input_order_while_calls_overlap() -> None:
+    lock = threading.Lock()
+    active, peak = 0, 0
+
+    def slow_square(item: int) -> int:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        # Later items finish first, so order must come from ordered_map itself
+        time.sleep(0.02 * (10 - item))
+        with lock:
+            active -= 1
+        return item * item
+
+    assert list(ordered_map(slow_square, range(10), concurrency=4)) == [(item, item * item) for item in range(10)]
+    assert peak > 1
+
+
+def test_input_is_consumed_in_a_bounded_window() -> None:
+    pulled = count()
+
+    def items():  # type: ignore[no-untyped-def]
+        for item in range(1_000):
+            next(pulled)
+            yield item
+
+    results = ordered_map(lambda item: item, items(), concurrency=3)
+    assert next(results) == (0, 0)
+    assert next(pulled) <= 2 * 3 + 1
+    results.close()
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_exceptions_propagate_after_earlier_results(concurrency: int) -> None:
+    def fail_on_three(item: int) -> int:
+        if item == 3:
+            raise ValueError(f"bad item {item}")
+        return item
+
+    seen = []
+    with pytest.raises(ValueError, match="bad item 3"):
+        for item, result in ordered_map(fail_on_three, range(10), concurrency=concurrency):
+            seen.append(result)
+    assert seen == [0, 1, 2]
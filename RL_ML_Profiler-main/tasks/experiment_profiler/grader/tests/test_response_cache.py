@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from tasks.experiment_profiler.reference_submission.experiment_profiler.config import ExperimentConfig
+from tasks.experiment_profiler.reference_submission.experiment_profiler.runner import ExperimentRunner
+from tasks.experiment_profiler.reference_submission.experiment_profiler.simulation import ClientFactory
+from tasks.experiment_profiler.tools.anthropic_client import AnthropicResponse
+from tasks.experiment_profiler.tools.dataset import DialogueSample
+from tasks.experiment_profiler.tools import response_cache
+from tasks.experiment_profiler.tools.response_cache import CachingClient, ResponseCache
+
+ROOT = Path(__file__).resolve().parents[2]
+CONFIG = ROOT / "configs" / "sample_experiment.yaml"
+
+
+class _Client:
+    model = "claude-haiku-4-5"
+    temperature = 0.0
+    max_tokens = 200
+
+    def __init__(self, backend: str) -> None:
+        self.backend = backend
+        self.calls = 0
+
+    def complete(self, sample: DialogueSample) -> AnthropicResponse:
+        self.calls += 1
+        return AnthropicResponse(completion=f"{self.backend} answer", metadata={})
+
+
+def test_simulated_completions_are_not_served_to_live_runs(tmp_path: Path) -> None:
+    sample = DialogueSample(dialogue_id="d", system="s", user="u", required_facts=[])
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    CachingClient(_Client("simulator"), cache).complete(sample)
+
+    live = _Client("live")
+    assert CachingClient(live, cache).complete(sample).completion == "live answer"
+    assert live.calls == 1
+    cache.close()
+
+
+def test_cache_defaults_on_only_at_temperature_zero(tmp_path: Path) -> None:
+    config = ExperimentConfig.from_yaml(CONFIG)
+    runner = ExperimentRunner(config=config, factory=ClientFactory(ROOT / "data" / "mock_responses.json"))
+
+    config.temperature = 0.2
+    assert runner._open_cache(tmp_path) is None
+
+    config.temperature = 0.0
+    cache = runner._open_cache(tmp_path)
+    assert cache is not None
+    cache.close()
+
+    config.temperature, config.cache = 0.2, True
+    cache = runner._open_cache(tmp_path)
+    assert cache is not None
+    cache.close()
+
+
+def _response(index: int) -> AnthropicResponse:
+    return AnthropicResponse(completion=f"answer {index:04d}", metadata={})
+
+
+def test_max_bytes_evicts_least_recently_read_first(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    clock = iter(range(1, 100))
+    monkeypatch.setattr(response_cache.time, "time", lambda: float(next(clock)))
+    size = len(json.dumps({"completion": _response(0).completion, "metadata": {}}).encode("utf-8"))
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_bytes=4 * size, commit_every=1)
+    for index in range(4):
+        cache.put(f"k{index}", _response(index))
+    assert cache.get("k0") is not None
+
+    # Over the cap: the two least recently read go, leaving 3 entries (under 90% of it)
+    cache.put("k4", _response(4))
+    assert [key for key in ("k0", "k1", "k2", "k3", "k4") if cache.get(key) is not None] == ["k0", "k3", "k4"]
+    assert cache._conn.execute("SELECT entries, bytes FROM totals").fetchone() == (3, 3 * size)
+    cache.close()
+
+
+def test_buffered_writes_are_committed_on_close(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_entries=1000)
+    for index in range(10):
+        cache.put(f"k{index}", _response(index))
+    cache.close()
+
+    reopened = ResponseCache(tmp_path / "cache.sqlite")
+    assert reopened.get("k9") == _response(9)
+    assert reopened._conn.execute("SELECT entries FROM totals").fetchone() == (10,)
+    reopened.close()
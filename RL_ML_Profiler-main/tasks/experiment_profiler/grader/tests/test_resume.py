@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+import yaml
+
+from tasks.experiment_profiler.reference_submission.experiment_profiler.catalog import RunCatalog
+from tasks.experiment_profiler.reference_submission.experiment_profiler.config import ExperimentConfig
+from tasks.experiment_profiler.reference_submission.experiment_profiler.runner import ExperimentRunner
+from tasks.experiment_profiler.reference_submission.experiment_profiler.simulation import ClientFactory
+
+ROOT = Path(__file__).resolve().parents[2]
+CONFIG = ROOT / "configs" / "sample_experiment.yaml"
+RESPONSES = ROOT / "data" / "mock_responses.json"
+
+
+def _runner(tmp_path: Path, **overrides: object) -> ExperimentRunner:
+    payload = yaml.safe_load(CONFIG.read_text(encoding="utf-8"))
+    payload.update(dataset_path=str(ROOT.parents[1] / payload["dataset_path"]), cache=True, flush_every=1, **overrides)
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump(payload), encoding="utf-8")
+    return ExperimentRunner(config=ExperimentConfig.from_yaml(config_path), factory=ClientFactory(RESPONSES))
+
+
+def _logs(run_dir: Path) -> list:
+    return [(run_dir / name).read_text(encoding="utf-8") for name in ("requests.jsonl", "responses.jsonl")]
+
+
+def test_interrupted_run_resumes_to_the_same_summary(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    expected = _runner(tmp_path).run(tmp_path / "whole")
+
+    interrupted = _runner(tmp_path)
+    complete = interrupted._complete
+
+    def crash_after_two(samples, cache):  # type: ignore[no-untyped-def]
+        for index, item in enumerate(complete(samples, cache)):
+            if index == 2:
+                raise KeyboardInterrupt
+            yield item
+
+    monkeypatch.setattr(interrupted, "_complete", crash_after_two)
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.run(tmp_path / "resumed")
+    run_dir = tmp_path / "resumed" / "demo_run"
+    with (run_dir / "responses.jsonl").open("a", encoding="utf-8") as handle:
+        handle.write('{"dialogue_id": "torn')
+
+    resumed = _runner(tmp_path).run(tmp_path / "resumed")
+    # The response fetched just before the crash is served from the cache on resume
+    counters = {name: resumed.metrics.pop(name) for name in ("cache_hits", "cache_misses")}
+    assert counters == {"cache_hits": 1, "cache_misses": 2}
+    assert resumed.metrics == {name: value for name, value in expected.metrics.items() if name not in counters}
+    assert json.loads((run_dir / "summary.json").read_text(encoding="utf-8")) == {**resumed.metrics, **counters}
+    assert _logs(run_dir) == _logs(tmp_path / "whole" / "demo_run")
+
+    # Rerunning a finished run with other metrics rescores the logs instead of
+    # returning the stale summary, requests nothing and is cataloged again
+    again = _runner(tmp_path, metrics=["refusal_rate"]).run(tmp_path / "resumed")
+    assert "fact_coverage" not in again.metrics
+    assert again.metrics["refusal_rate"] == expected.metrics["refusal_rate"]
+    assert {name: again.metrics[name] for name in counters} == counters
+    assert json.loads((run_dir / "summary.json").read_text(encoding="utf-8")) == again.metrics
+    assert _logs(run_dir) == _logs(tmp_path / "whole" / "demo_run")
+    catalog = RunCatalog(tmp_path / "resumed" / "catalog.sqlite")
+    assert [entry.metrics for entry in catalog.runs()] == [again.metrics, {**resumed.metrics, **counters}]
+    catalog.close()
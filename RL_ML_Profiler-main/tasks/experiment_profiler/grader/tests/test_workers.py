@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import yaml
+
+from tasks.experiment_profiler.reference_submission.experiment_profiler.catalog import RunCatalog
+
+ROOT = Path(__file__).resolve().parents[4]
+CONFIG = ROOT / "tasks" / "experiment_profiler" / "configs" / "sample_experiment.yaml"
+CLI_MODULE = "tasks.experiment_profiler.reference_submission.experiment_profiler.cli"
+
+
+def _cli(*args: object, check: bool = True) -> subprocess.CompletedProcess:
+    # Without an API key the runner uses the deterministic simulator
+    env = {key: value for key, value in os.environ.items() if key != "ANTHROPIC_API_KEY"}
+    command = [sys.executable, "-m", CLI_MODULE, *map(str, args)]
+    return subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=check)
+
+
+def _artifacts(run_dir: Path) -> dict:
+    return {name: (run_dir / name).read_text(encoding="utf-8") for name in ("requests.jsonl", "responses.jsonl", "summary.json")}
+
+
+def test_workers_match_single_process_run(tmp_path: Path) -> None:
+    _cli("run", "--config", CONFIG, "--output-dir", tmp_path / "single", "--no-cache")
+    _cli("run", "--config", CONFIG, "--output-dir", tmp_path / "workers", "--no-cache", "--workers", 2)
+
+    assert _artifacts(tmp_path / "workers" / "demo_run") == _artifacts(tmp_path / "single" / "demo_run")
+
+
+def test_worker_queue_is_tied_to_its_config(tmp_path: Path) -> None:
+    payload = yaml.safe_load(CONFIG.read_text(encoding="utf-8"))
+    payload["dataset_path"] = str(ROOT / payload["dataset_path"])
+    payload["temperature"] = 0.9
+    hotter = tmp_path / "hotter.yaml"
+    hotter.write_text(yaml.safe_dump(payload), encoding="utf-8")
+    output_dir = tmp_path / "runs"
+
+    _cli("run", "--config", CONFIG, "--output-dir", output_dir, "--no-cache", "--workers", 2)
+
+    refused = _cli("run", "--config", hotter, "--output-dir", output_dir, "--no-cache", "--workers", 2, check=False)
+    assert refused.returncode != 0
+    assert "different config" in refused.stderr
+
+    # Merging shards under another config is refused before anything is registered
+    refused = _cli("merge", "--config", hotter, "--output-dir", output_dir, check=False)
+    assert refused.returncode != 0
+    assert "different config" in refused.stderr
+    catalog = RunCatalog(output_dir / "catalog.sqlite")
+    assert len(catalog.runs()) == 1
+    catalog.close()
+
+    _cli("run", "--config", hotter, "--output-dir", output_dir, "--no-cache", "--workers", 2, "--fresh")
+    with (output_dir / "demo_run" / "requests.jsonl").open(encoding="utf-8") as handle:
+        assert {json.loads(line)["temperature"] for line in handle} == {0.9}
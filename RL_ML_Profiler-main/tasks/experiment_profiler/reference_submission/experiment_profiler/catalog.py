@@ -0,0 +1,223 @@
+"""Indexed catalog of finished runs for cross-run queries (reference implementation)."""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Columns `best` may group by; anything else would be interpolated into SQL
+GROUP_COLUMNS = ("model", "experiment_id", "temperature", "config_hash")
+
+_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+_DURATION_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+@dataclass
+class CatalogEntry:
+    run_id: int
+    experiment_id: str
+    model: str
+    temperature: float
+    config_hash: str
+    output_dir: str
+    started: float
+    finished: float
+    metrics: Dict[str, Any]
+    cpu_seconds: Dict[str, float]
+    artifacts: Dict[str, str]
+
+
+class RunCatalog:
+    """SQLite index of every run written under a runs directory.
+
+    Each finished run adds one row with its config hash, model settings,
+    summary, metric timings and artifact paths. Numeric summary values are
+    also stored one per row in an indexed `metrics` table, so ranking runs
+    by a metric never opens their directories. Rerunning an experiment into
+    the same directory adds a new row; earlier rows keep their own metrics.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=60.0)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id INTEGER PRIMARY KEY,
+                    experiment_id TEXT NOT NULL,
+                    config_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    temperature REAL NOT NULL,
+                    output_dir TEXT NOT NULL,
+                    started REAL NOT NULL,
+                    finished REAL NOT NULL,
+                    summary TEXT NOT NULL,
+                    cpu_seconds TEXT NOT NULL,
+                    artifacts TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS metrics (
+                    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+                    name TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (run_id, name)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS runs_finished ON runs (finished)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS runs_model ON runs (model, finished)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS metrics_name ON metrics (name, value)")
+
+    def register(
+        self,
+        *,
+        experiment_id: str,
+        config_hash: str,
+        model: str,
+        temperature: float,
+        output_dir: Path,
+        started: float,
+        summary: Dict[str, Any],
+        cpu_seconds: Dict[str, float],
+        artifacts: Dict[str, Path],
+        finished: Optional[float] = None,
+    ) -> int:
+        with self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO runs (experiment_id, config_hash, model, temperature, output_dir, started, finished, summary, cpu_seconds, artifacts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    experiment_id,
+                    config_hash,
+                    model,
+                    temperature,
+                    str(output_dir),
+                    started,
+                    time.time() if finished is None else finished,
+                    json.dumps(summary, sort_keys=True),
+                    json.dumps(cpu_seconds, sort_keys=True),
+                    json.dumps({name: str(path) for name, path in artifacts.items()}, sort_keys=True),
+                ),
+            )
+            run_id = int(cursor.lastrowid)
+            self._conn.executemany(
+                "INSERT INTO metrics (run_id, name, value) VALUES (?, ?, ?)",
+                [
+                    (run_id, name, float(value))
+                    for name, value in summary.items()
+                    if isinstance(value, (int, float)) and not isinstance(value, bool)
+                ],
+            )
+        return run_id
+
+    def runs(
+        self,
+        *,
+        model: Optional[str] = None,
+        experiment_id: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 50,
+    ) -> List[CatalogEntry]:
+        """Most recent runs first, optionally filtered."""
+
+        clauses, params = _filters(model=model, experiment_id=experiment_id, since=since)
+        rows = self._conn.execute(
+            f"SELECT * FROM runs {clauses} ORDER BY finished DESC, run_id DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [_entry(row) for row in rows]
+
+    def best(
+        self,
+        metric: str,
+        *,
+        by: str = "model",
+        since: Optional[float] = None,
+        model: Optional[str] = None,
+        experiment_id: Optional[str] = None,
+        lowest: bool = False,
+    ) -> List[CatalogEntry]:
+        """The top run for `metric` within each `by` group, best group first.
+
+        Higher values win unless `lowest` is set (e.g. for `refusal_rate`);
+        ties go to the most recent run.
+        """
+
+        if by not in GROUP_COLUMNS:
+            raise ValueError(f"Cannot group runs by {by!r}; expected one of {', '.join(GROUP_COLUMNS)}")
+        order = "ASC" if lowest else "DESC"
+        clauses, params = _filters(model=model, experiment_id=experiment_id, since=since, table="runs.")
+        clauses = f"{clauses} AND" if clauses else "WHERE"
+        rows = self._conn.execute(
+            f"""
+            SELECT * FROM (
+                SELECT runs.*, ROW_NUMBER() OVER (
+                    PARTITION BY runs.{by} ORDER BY metrics.value {order}, runs.finished DESC
+                ) AS rank, metrics.value AS ranked_value
+                FROM metrics JOIN runs ON runs.run_id = metrics.run_id
+                {clauses} metrics.name = ?
+            ) WHERE rank = 1 ORDER BY ranked_value {order}
+            """,
+            (*params, metric),
+        ).fetchall()
+        return [_entry(row[:-2]) for row in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def parse_since(text: str) -> float:
+    """Turn `30m`, `12h`, `7d`, `2w` or an ISO date into a Unix timestamp."""
+
+    match = _DURATION_RE.match(text.strip())
+    if match:
+        return time.time() - float(match.group(1)) * _DURATION_SECONDS[match.group(2)]
+    try:
+        return datetime.fromisoformat(text.strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"Cannot parse {text!r} as a duration like 7d or an ISO date") from None
+
+
+def _filters(*, model: Optional[str], experiment_id: Optional[str], since: Optional[float], table: str = "") -> Tuple[str, List[Any]]:
+    clauses: List[str] = []
+    params: List[Any] = []
+    if model is not None:
+        clauses.append(f"{table}model = ?")
+        params.append(model)
+    if experiment_id is not None:
+        clauses.append(f"{table}experiment_id = ?")
+        params.append(experiment_id)
+    if since is not None:
+        clauses.append(f"{table}finished >= ?")
+        params.append(since)
+    return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _entry(row: tuple) -> CatalogEntry:
+    run_id, experiment_id, config_hash, model, temperature, output_dir, started, finished, summary, cpu_seconds, artifacts = row
+    return CatalogEntry(
+        run_id=run_id,
+        experiment_id=experiment_id,
+        model=model,
+        temperature=temperature,
+        config_hash=config_hash,
+        output_dir=output_dir,
+        started=started,
+        finished=finished,
+        metrics=json.loads(summary),
+        cpu_seconds=json.loads(cpu_seconds),
+        artifacts=json.loads(artifacts),
+    )
@@ -3,32 +3,56 @@
 from __future__ import annotations
 
 import json
+import re
+from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence
 
 import click
 
-try:  # pragma: no cover - optional dependency in the execution environment
-    from rich.console import Console  # type: ignore
-    from rich.table import Table  # type: ignore
-except Exception:  # pragma: no cover - falls back to stdlib rendering
-    Console = None  # type: ignore
-    Table = None  # type: ignore
+# Everything heavy (Rich, the runner and through it the Anthropic SDK, numpy,
+# pyarrow, SQLite) is imported inside the commands that use it, so a command
+# like `summarize` starts without loading any of it
+if TYPE_CHECKING:  # pragma: no cover
+    from .catalog import RunCatalog
+    from .runner import ExperimentRunner
 
-_MARKUP_RE = __import__("re").compile(r"\[(?:/?)[^\[\]]+\]")
+_MARKUP_RE = re.compile(r"\[(?:/?)[^\[\]]+\]")
+_RICH: Dict[str, Any] = {}
+
+
+def _rich(name: str) -> Any:
+    """Return `Console` or `Table` from Rich, importing it on first use (None without Rich)."""
+
+    if not _RICH:
+        try:  # pragma: no cover - optional dependency in the execution environment
+            from rich.console import Console  # type: ignore
+            from rich.table import Table  # type: ignore
+        except Exception:  # pragma: no cover - falls back to stdlib rendering
+            Console = None  # type: ignore
+            Table = None  # type: ignore
+        _RICH.update(Console=Console, Table=Table)
+    return _RICH[name]
 
-from .config import ExperimentConfig
-from .runner import ExperimentRunner
-from .simulation import ClientFactory
 
 class _ConsoleWrapper:
     """Minimal console facade that degrades gracefully without Rich."""
 
     def __init__(self) -> None:
-        self._rich_console = Console() if Console is not None else None
+        self._loaded = False
+        self._console: Any = None
+
+    @property
+    def rich_console(self) -> Any:
+        if not self._loaded:
+            console_class = _rich("Console")
+            self._console = console_class() if console_class is not None else None
+            self._loaded = True
+        return self._console
 
     def print(self, message: object) -> None:
-        if self._rich_console is not None:
-            self._rich_console.print(message)
+        if self.rich_console is not None:
+            self.rich_console.print(message)
         else:
             if isinstance(message, str):
                 print(_MARKUP_RE.sub("", message))
@@ -38,10 +62,29 @@ class _ConsoleWrapper:
 
 CONSOLE = _ConsoleWrapper()
 DEFAULT_RESPONSES = Path(__file__).resolve().parents[2] / "data" / "mock_responses.json"
+LIST_METRICS = ("geometric_mean", "fact_coverage", "refusal_rate")
 
 
-def _build_runner(config_path: Path) -> ExperimentRunner:
+def _build_runner(
+    config_path: Path,
+    concurrency: int | None = None,
+    batch: bool = False,
+    no_cache: bool = False,
+    fresh: bool = False,
+) -> ExperimentRunner:
+    from .config import ExperimentConfig
+    from .runner import ExperimentRunner
+    from .simulation import ClientFactory
+
     config = ExperimentConfig.from_yaml(config_path)
+    if concurrency is not None:
+        config.concurrency = concurrency
+    if batch:
+        config.batch = True
+    if no_cache:
+        config.cache = False
+    if fresh:
+        config.resume = False
     factory = ClientFactory(DEFAULT_RESPONSES)
     return ExperimentRunner(config=config, factory=factory)
 
@@ -54,13 +97,77 @@ def cli() -> None:
 @cli.command()
 @click.option("--config", "config_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), required=True)
 @click.option("--output-dir", type=click.Path(file_okay=False, path_type=Path), required=True)
-def run(config_path: Path, output_dir: Path) -> None:
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of completions requested in parallel (overrides the config).",
+)
+@click.option("--batch", is_flag=True, help="Submit all dialogues through the Message Batches API.")
+@click.option("--no-cache", is_flag=True, help="Bypass the on-disk response cache.")
+@click.option("--fresh", is_flag=True, help="Discard logs from a previous run instead of resuming it.")
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Split the run across this many worker processes, then merge their shards.",
+)
+def run(config_path: Path, output_dir: Path, concurrency: int | None, batch: bool, no_cache: bool, fresh: bool, workers: int) -> None:
     """Execute a profiling run and write logs to the output directory."""
 
-    runner = _build_runner(config_path)
-    result = runner.run(output_dir)
+    runner = _build_runner(config_path, concurrency, batch, no_cache, fresh)
+    try:
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            if not runner.config.resume:
+                runner.reset_workers(output_dir)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(runner.work, output_dir, f"worker-{index}") for index in range(workers)]
+                for future in futures:
+                    future.result()
+            result = runner.merge(output_dir)
+        else:
+            result = runner.run(output_dir)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
     CONSOLE.print(f"[green]Completed experiment {runner.config.experiment_id}[/green]")
     CONSOLE.print(f"Metrics written to [bold]{result.artifacts.summary_path}[/bold]")
+    _print_timings(result.metric_cpu_seconds)
+
+
+@cli.command()
+@click.option("--config", "config_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), required=True)
+@click.option("--output-dir", type=click.Path(file_okay=False, path_type=Path), required=True)
+@click.option("--worker-id", default=None, help="Shard name for this worker (defaults to host and pid).")
+@click.option("--concurrency", type=click.IntRange(min=1), default=None, help="Completions requested in parallel by this worker.")
+@click.option("--batch", is_flag=True, help="Submit each claim through the Message Batches API.")
+@click.option("--no-cache", is_flag=True, help="Bypass the on-disk response cache.")
+def worker(config_path: Path, output_dir: Path, worker_id: str | None, concurrency: int | None, batch: bool, no_cache: bool) -> None:
+    """Process dialogues from the shared work queue until it is drained."""
+
+    runner = _build_runner(config_path, concurrency, batch, no_cache)
+    try:
+        done = runner.work(output_dir, worker_id)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    CONSOLE.print(f"Worker finished {done} dialogues for {runner.config.experiment_id}")
+
+
+@cli.command()
+@click.option("--config", "config_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), required=True)
+@click.option("--output-dir", type=click.Path(file_okay=False, exists=True, path_type=Path), required=True)
+def merge(config_path: Path, output_dir: Path) -> None:
+    """Merge worker shards into ordered logs and a summary."""
+
+    runner = _build_runner(config_path)
+    try:
+        result = runner.merge(output_dir)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    CONSOLE.print(f"[green]Merged experiment {runner.config.experiment_id}[/green]")
+    CONSOLE.print(f"Metrics written to [bold]{result.artifacts.summary_path}[/bold]")
+    _print_timings(result.metric_cpu_seconds)
 
 
 @cli.command()
@@ -75,12 +182,171 @@ def summarize(log_dir: Path) -> None:
     with summary_path.open("r", encoding="utf-8") as handle:
         summary = json.load(handle)
 
-    if Table is not None and isinstance(CONSOLE, _ConsoleWrapper) and CONSOLE._rich_console is not None:
-        table = Table(title=f"Experiment Metrics ({summary_path.parent.name})")
+    # Token usage comes from the columnar artifact, reading a single column
+    columns_dir = log_dir / "responses.columns"
+    if columns_dir.exists():
+        from tasks.experiment_profiler.tools.columnar import read_columns
+
+        token_counts = read_columns(columns_dir, ["token_count"])["token_count"]
+        summary["total_tokens"] = int(sum(token_counts))
+        summary["mean_token_count"] = sum(token_counts) / len(token_counts) if token_counts else 0.0
+
+    _print_summary(f"Experiment Metrics ({summary_path.parent.name})", summary)
+
+
+@cli.command()
+@click.option("--config", "config_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), required=True)
+@click.option("--log-dir", type=click.Path(file_okay=False, exists=True, path_type=Path), required=True)
+def rescore(config_path: Path, log_dir: Path) -> None:
+    """Recompute metrics from the responses logged by a previous run."""
+
+    runner = _build_runner(config_path)
+    try:
+        summary = runner.rescore(log_dir)
+    except (FileNotFoundError, ValueError) as exc:
+        raise click.ClickException(str(exc)) from exc
+    _print_summary(f"Rescored Metrics ({log_dir.name})", summary)
+
+
+def _catalog_options(command: Any) -> Any:
+    options = [
+        click.option("--runs-dir", type=click.Path(file_okay=False, path_type=Path), default=Path("runs"), show_default=True, help="Output directory the runs were written to."),
+        click.option("--catalog", "catalog_path", type=click.Path(dir_okay=False, path_type=Path), default=None, help="Catalog file (defaults to RUNS_DIR/catalog.sqlite)."),
+        click.option("--model", default=None, help="Only runs of this model."),
+        click.option("--experiment", "experiment_id", default=None, help="Only runs of this experiment id."),
+        click.option("--since", default=None, help="Only runs finished within a duration (30m, 12h, 7d, 2w) or since an ISO date."),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def _open_catalog(runs_dir: Path, catalog_path: Path | None) -> RunCatalog:
+    from .catalog import RunCatalog
+
+    path = catalog_path or runs_dir / "catalog.sqlite"
+    if not path.exists():
+        raise click.ClickException(f"No run catalog at {path}; runs register there when they finish")
+    return RunCatalog(path)
+
+
+def _since(text: str | None) -> float | None:
+    if text is None:
+        return None
+    from .catalog import parse_since
+
+    try:
+        return parse_since(text)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="--since") from exc
+
+
+@cli.command(name="list")
+@_catalog_options
+@click.option("--metric", "metric_names", multiple=True, help="Metric column to show (repeatable).")
+@click.option("--limit", type=click.IntRange(min=1), default=20, show_default=True)
+def list_runs(
+    runs_dir: Path,
+    catalog_path: Path | None,
+    model: str | None,
+    experiment_id: str | None,
+    since: str | None,
+    metric_names: Sequence[str],
+    limit: int,
+) -> None:
+    """List cataloged runs, most recent first."""
+
+    catalog = _open_catalog(runs_dir, catalog_path)
+    try:
+        entries = catalog.runs(model=model, experiment_id=experiment_id, since=_since(since), limit=limit)
+    finally:
+        catalog.close()
+
+    names = list(metric_names or LIST_METRICS)
+    rows = [
+        [str(entry.run_id), entry.experiment_id, entry.model, f"{entry.temperature:g}", _timestamp(entry.finished)]
+        + [_format_value(entry.metrics.get(name)) for name in names]
+        + [entry.output_dir]
+        for entry in entries
+    ]
+    _print_table("Runs", ["Run", "Experiment", "Model", "Temp", "Finished", *names, "Output"], rows)
+
+
+@cli.command()
+@_catalog_options
+@click.option("--metric", required=True, help="Summary metric to rank runs by, e.g. geometric_mean.")
+@click.option("--by", type=click.Choice(["model", "experiment_id", "temperature", "config_hash"]), default="model", show_default=True)
+@click.option("--lowest", is_flag=True, help="Rank lower values first (e.g. for refusal_rate).")
+def compare(
+    runs_dir: Path,
+    catalog_path: Path | None,
+    model: str | None,
+    experiment_id: str | None,
+    since: str | None,
+    metric: str,
+    by: str,
+    lowest: bool,
+) -> None:
+    """Show the best run for a metric within each model (or other group)."""
+
+    catalog = _open_catalog(runs_dir, catalog_path)
+    try:
+        entries = catalog.best(metric, by=by, since=_since(since), model=model, experiment_id=experiment_id, lowest=lowest)
+    finally:
+        catalog.close()
+
+    rows = [
+        [str(getattr(entry, by)), _format_value(entry.metrics.get(metric)), str(entry.run_id), entry.experiment_id, _timestamp(entry.finished), entry.output_dir]
+        for entry in entries
+    ]
+    _print_table(f"{'Lowest' if lowest else 'Best'} {metric} by {by}", [by, metric, "Run", "Experiment", "Finished", "Output"], rows)
+
+
+def _timestamp(value: float) -> str:
+    return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M")
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.4f}" if isinstance(value, float) else str(value)
+
+
+def _print_table(title: str, headers: List[str], rows: List[List[str]]) -> None:
+    table_class = _rich("Table")
+    if table_class is not None and CONSOLE.rich_console is not None:
+        table = table_class(title=title)
+        for header in headers:
+            table.add_column(header)
+        for row in rows:
+            table.add_row(*row)
+        CONSOLE.print(table)
+        return
+
+    # Fallback: plain aligned columns; the list keeps max() valid with no rows
+    widths = [max([len(header), *(len(row[index]) for row in rows)]) for index, header in enumerate(headers)]
+    CONSOLE.print(title)
+    CONSOLE.print(" | ".join(header.ljust(width) for header, width in zip(headers, widths)))
+    CONSOLE.print("-+-".join("-" * width for width in widths))
+    for row in rows:
+        CONSOLE.print(" | ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+def _print_timings(cpu_seconds: Dict[str, float]) -> None:
+    total = sum(cpu_seconds.values())
+    for name, seconds in sorted(cpu_seconds.items(), key=lambda item: item[1], reverse=True):
+        share = seconds / total if total else 0.0
+        CONSOLE.print(f"  {name}: {seconds:.4f}s CPU ({share:.0%})")
+
+
+def _print_summary(title: str, summary: Dict[str, Any]) -> None:
+    table_class = _rich("Table")
+    if table_class is not None and isinstance(CONSOLE, _ConsoleWrapper) and CONSOLE.rich_console is not None:
+        table = table_class(title=title)
         table.add_column("Metric")
         table.add_column("Value", justify="right")
         for key, value in summary.items():
-            if isinstance(value, (int, float)):
+            if isinstance(value, float):
                 table.add_row(key, f"{value:.4f}")
             else:
                 table.add_row(key, str(value))
@@ -88,14 +354,13 @@ def summarize(log_dir: Path) -> None:
         return
 
     # Fallback: render a simple aligned table using only stdlib features.
-    header = f"Experiment Metrics ({summary_path.parent.name})"
-    CONSOLE.print(header)
-    max_key = max(len("Metric"), *(len(key) for key in summary))
+    CONSOLE.print(title)
+    max_key = max([len("Metric"), *(len(key) for key in summary)])
     CONSOLE.print("-" * (max_key + 15))
     CONSOLE.print(f"{'Metric'.ljust(max_key)} | Value")
     CONSOLE.print("-" * (max_key + 15))
     for key, value in summary.items():
-        if isinstance(value, (int, float)):
+        if isinstance(value, float):
             formatted = f"{value:.4f}"
         else:
             formatted = str(value)
@@ -2,9 +2,10 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import glob
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, List, Optional
 
 from tasks.experiment_profiler.tools.config_loader import load_yaml
 
@@ -17,23 +18,40 @@ class ExperimentConfig:
     model: str
     max_tokens: int
     temperature: float
-    dataset_path: Path
+    dataset_path: Path | List[Path]
     log_schema_version: int
     output_fields: List[str]
     metrics: List[str]
+    metric_plugins: List[str] = field(default_factory=list)
+    concurrency: int = 1
+    batch: bool = False
+    # None caches only at temperature 0, where repeated samples are meant to agree
+    cache: Optional[bool] = None
+    cache_path: Optional[Path] = None
+    cache_max_entries: Optional[int] = None
+    cache_max_bytes: Optional[int] = None
+    cache_max_age: Optional[float] = None
+    fsync: str = "batch"
+    flush_every: int = 1000
+    log_compression: str = "none"
+    prompt_dictionary: bool = False
+    resume: bool = True
+    catalog: bool = True
+    catalog_path: Optional[Path] = None
+    columnar: bool = False
+    claim_size: int = 100
+    lease_seconds: float = 600.0
 
     @classmethod
     def from_yaml(cls, path: str | Path) -> "ExperimentConfig":
         config_path = Path(path).expanduser().resolve()
         payload = load_yaml(config_path)
 
-        dataset_path = Path(payload["dataset_path"]).expanduser()
-        if not dataset_path.is_absolute():
-            candidate = (config_path.parent / dataset_path).resolve()
-            if candidate.exists():
-                dataset_path = candidate
-            else:
-                dataset_path = (REPO_ROOT / dataset_path).resolve()
+        entries = payload["dataset_path"]
+        if isinstance(entries, list):
+            dataset_path: Path | List[Path] = [_resolve_dataset(config_path, entry) for entry in entries]
+        else:
+            dataset_path = _resolve_dataset(config_path, entries)
 
         return cls(
             experiment_id=str(payload["experiment_id"]),
@@ -44,4 +62,39 @@ class ExperimentConfig:
             log_schema_version=int(payload.get("log_schema_version", 1)),
             output_fields=list(payload.get("output_fields", [])),
             metrics=list(payload.get("metrics", [])),
+            metric_plugins=list(payload.get("metric_plugins", [])),
+            concurrency=int(payload.get("concurrency", 1)),
+            batch=bool(payload.get("batch", False)),
+            cache=_optional(bool, payload.get("cache")),
+            cache_path=Path(payload["cache_path"]).expanduser() if payload.get("cache_path") else None,
+            cache_max_entries=_optional(int, payload.get("cache_max_entries")),
+            cache_max_bytes=_optional(int, payload.get("cache_max_bytes")),
+            cache_max_age=_optional(float, payload.get("cache_max_age")),
+            fsync=str(payload.get("fsync", "batch")),
+            flush_every=int(payload.get("flush_every", 1000)),
+            log_compression=str(payload.get("log_compression", "none")),
+            prompt_dictionary=bool(payload.get("prompt_dictionary", False)),
+            resume=bool(payload.get("resume", True)),
+            catalog=bool(payload.get("catalog", True)),
+            catalog_path=Path(payload["catalog_path"]).expanduser() if payload.get("catalog_path") else None,
+            columnar=bool(payload.get("columnar", False)),
+            claim_size=int(payload.get("claim_size", 100)),
+            lease_seconds=float(payload.get("lease_seconds", 600.0)),
         )
+
+
+def _resolve_dataset(config_path: Path, entry: str) -> Path:
+    """Resolve a dataset file, directory or glob against the config, then the repo root."""
+
+    dataset_path = Path(entry).expanduser()
+    if dataset_path.is_absolute():
+        return dataset_path
+
+    candidate = config_path.parent / dataset_path
+    if candidate.exists() or glob.glob(str(candidate)):
+        return candidate.resolve()
+    return (REPO_ROOT / dataset_path).resolve()
+
+
+def _optional(cast: Callable[[Any], Any], value: Any) -> Any:
+    return None if value is None else cast(value)
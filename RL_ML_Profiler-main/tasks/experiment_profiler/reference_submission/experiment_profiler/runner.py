@@ -2,22 +2,73 @@
 
 from __future__ import annotations
 
+import hashlib
+import importlib
 import json
-from dataclasses import dataclass
+import os
+import socket
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar
 
 from tasks.experiment_profiler.tools import dataset, logging_utils, metrics
+from tasks.experiment_profiler.tools.anthropic_client import AnthropicResponse
+from tasks.experiment_profiler.tools.columnar import ColumnarWriter, read_columns
+from tasks.experiment_profiler.tools.response_cache import CachingClient, ResponseCache
 
+from .catalog import RunCatalog
 from .config import ExperimentConfig
 from .simulation import ClientFactory
-from .storage import RunArtifacts, prepare_output_dir, write_requests, write_responses, write_summary
+from .storage import LogWriter, RunArtifacts, prepare_output_dir, repair_jsonl, resume_run, save_run_state, write_summary
+from .work_queue import WorkQueue, merge_shards, reset, shard_record
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def ordered_map(fn: Callable[[T], R], items: Iterable[T], concurrency: int = 1) -> Iterator[Tuple[T, R]]:
+    """
+    Yield `(item, fn(item))` pairs in input order, running up to `concurrency`
+    calls at once on a thread pool. Only a bounded window of items is in flight,
+    so arbitrarily long iterables are consumed lazily.
+    """
+    if concurrency <= 1:
+        for item in items:
+            yield item, fn(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending: Deque[Tuple[T, Future]] = deque()
+        for item in items:
+            pending.append((item, executor.submit(fn, item)))
+            # Keep a small backlog queued so workers never idle between results
+            if len(pending) >= 2 * concurrency:
+                head, future = pending.popleft()
+                yield head, future.result()
+        while pending:
+            head, future = pending.popleft()
+            yield head, future.result()
 
 
 @dataclass
 class RunResult:
     artifacts: RunArtifacts
     metrics: Dict[str, float]
+    metric_cpu_seconds: Dict[str, float] = field(default_factory=dict)
+
+
+def _sum_worker_files(paths: Iterable[Path]) -> Dict[str, float]:
+    totals: Dict[str, float] = {}
+    for path in sorted(paths):
+        with path.open("r", encoding="utf-8") as handle:
+            for key, value in json.load(handle).items():
+                totals[key] = totals.get(key, 0) + value
+    return totals
 
 
 class ExperimentRunner:
@@ -26,61 +77,350 @@ class ExperimentRunner:
         self.factory = factory
 
     def run(self, output_dir: str | Path | None = None) -> RunResult:
+        started = time.time()
+
         # Set up output directory structure
         base_dir = Path(output_dir or "runs")
         artifacts = prepare_output_dir(base_dir, self.config.experiment_id)
 
+        # Responses for unchanged dialogues are served from the on-disk cache
+        cache = self._open_cache(base_dir)
+
+        # Requested metrics are accumulated as dialogues complete; logs go straight to disk
+        suite = self._metric_suite()
+        accumulator = metrics.MetricsAccumulator(suite.names)
+        columns = self._open_columns(artifacts, suite.names)
+
+        # Pick up after the last complete record of an interrupted run, rebuilding
+        # metric state from the dialogues that are already logged
+        fingerprint = self._fingerprint()
+        completed, cache_counts = resume_run(artifacts, fingerprint, resume=self.config.resume, compression=self.config.log_compression)
+        samples = iter(dataset.load_dialogues(self.config.dataset_path))
+        logged = logging_utils.read_jsonl(artifacts.responses_path) if completed else iter(())
+        for sample, payload in zip(islice(samples, completed), logged):
+            record = logging_utils.response_from_dict(payload)
+            if record.dialogue_id != sample.dialogue_id:
+                raise ValueError(
+                    f"Cannot resume {artifacts.output_dir}: logged dialogue {record.dialogue_id!r} does not match "
+                    f"dataset entry {sample.dialogue_id!r}; rerun with --fresh"
+                )
+            scores = suite.score(sample, record.completion, record.metadata)
+            accumulator.add_scores(scores)
+            if columns is not None:
+                columns.write(record, scores)
+
+        # Main loop: process each remaining dialogue from the dataset. Completions
+        # may be requested concurrently or in batches, but arrive in dataset order.
+        processed = 0
+        try:
+            with LogWriter(artifacts, append=completed > 0, **self._log_options()) as writer:
+                for sample, response, cached in self._complete(samples, cache):
+                    request_log, response_log = self._logs(sample, response)
+                    writer.write(request_log, response_log)
+                    processed += 1
+                    if cached is not None:
+                        cache_counts["cache_hits" if cached else "cache_misses"] += 1
+                    if writer.flushed:
+                        # Counters are saved together with the records they describe
+                        save_run_state(artifacts, fingerprint, completed + processed, cache_counts)
+
+                    # Calculate per-dialogue metrics
+                    scores = suite.score(sample, response.completion, response.metadata)
+                    accumulator.add_scores(scores)
+                    if columns is not None:
+                        columns.write(response_log, scores)
+        finally:
+            # Responses already paid for stay cached even if the run is interrupted
+            if cache is not None:
+                cache.close()
+
+        save_run_state(artifacts, fingerprint, completed + processed, cache_counts)
+        if columns is not None:
+            columns.close()
+
+        # Aggregate all metrics. Logged dialogues were rescored above with the
+        # current metric suite, so even a rerun with nothing left to request
+        # reflects this config rather than the summary already on disk.
+        summary = accumulator.summary()
+        if cache is not None:
+            summary.update(cache_counts)
+
+        write_summary(artifacts.summary_path, summary)
+        write_summary(artifacts.timings_path, suite.cpu_seconds)
+        self._register(base_dir, artifacts, summary, suite.cpu_seconds, started)
+
+        return RunResult(artifacts=artifacts, metrics=summary, metric_cpu_seconds=suite.cpu_seconds)
+
+    def work(self, output_dir: str | Path | None = None, worker_id: str | None = None) -> int:
+        """Process dialogues from the shared queue until it is drained.
+
+        Any number of workers, on this host or others sharing the output
+        directory, can run at once. Each appends to its own shard; `merge`
+        combines the shards once the queue is empty. Returns the number of
+        dialogues this worker completed.
+        """
+
+        base_dir = Path(output_dir or "runs")
+        artifacts = prepare_output_dir(base_dir, self.config.experiment_id)
+        worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        cache = self._open_cache(base_dir)
+
+        queue = WorkQueue(artifacts.queue_path, lease_seconds=self.config.lease_seconds)
+        queue.populate(dataset.load_dialogues(self.config.dataset_path), self._fingerprint())
+        suite = self._metric_suite()
+
+        shard_path = artifacts.shards_dir / f"{worker_id}.jsonl"
+        if shard_path.exists():
+            repair_jsonl(shard_path)
+
+        done = 0
+        with logging_utils.JsonlWriter(shard_path, fsync=self.config.fsync, flush_every=self.config.flush_every, append=True) as shard:
+            while claimed := queue.claim(worker_id, self.config.claim_size):
+                completions = self._complete([sample for _, sample in claimed], cache)
+                for (seq, _), (sample, response, _) in zip(claimed, completions):
+                    request_log, response_log = self._logs(sample, response)
+                    scores = suite.score(sample, response.completion, response.metadata)
+                    shard.write(shard_record(seq, request_log, response_log, scores))
+
+                # Only mark the claim done once its records are durable in the shard
+                shard.flush()
+                if cache is not None:
+                    cache.flush()
+                queue.complete([seq for seq, _ in claimed])
+                done += len(claimed)
+
+        queue.close()
+        logging_utils.write_summary(artifacts.shards_dir / f"{worker_id}.timings.json", suite.cpu_seconds)
+        if cache is not None:
+            logging_utils.write_summary(artifacts.shards_dir / f"{worker_id}.cache.json", cache.stats())
+            cache.close()
+        return done
+
+    def reset_workers(self, output_dir: str | Path | None = None) -> None:
+        """Discard the work queue and shards left by an earlier worker-mode run."""
+
+        artifacts = prepare_output_dir(Path(output_dir or "runs"), self.config.experiment_id)
+        reset(artifacts.queue_path, artifacts.shards_dir)
+
+    def merge(self, output_dir: str | Path | None = None) -> RunResult:
+        """Combine worker shards into the same artifacts a single-process run writes."""
+
+        base_dir = Path(output_dir or "runs")
+        artifacts = prepare_output_dir(base_dir, self.config.experiment_id)
+
+        if not artifacts.queue_path.exists():
+            raise ValueError(f"Cannot merge {artifacts.output_dir}: no workers have run there yet")
+        queue = WorkQueue(artifacts.queue_path, lease_seconds=self.config.lease_seconds)
+        try:
+            # Shards written for another config must never be merged under this one
+            queue.check_fingerprint(self._fingerprint())
+        except ValueError:
+            queue.close()
+            raise
+        counts = queue.counts()
+        started = queue.populated_at() or time.time()
+        queue.close()
+        if not counts:
+            raise ValueError(f"Cannot merge {artifacts.output_dir}: no workers have run there yet")
+        unfinished = sum(count for status, count in counts.items() if status != "done")
+        if unfinished:
+            raise ValueError(f"Cannot merge {artifacts.output_dir}: {unfinished} dialogues are not finished yet")
+
+        names = self.config.metrics or list(metrics.DEFAULT_METRICS)
+        accumulator = metrics.MetricsAccumulator(names)
+        columns = self._open_columns(artifacts, names)
+        with LogWriter(artifacts, **self._log_options()) as writer:
+            for record in merge_shards(sorted(artifacts.shards_dir.glob("*.jsonl"))):
+                writer.write_payloads(record["request"], record["response"])
+                accumulator.add_scores(record["scores"])
+                if columns is not None:
+                    columns.write(logging_utils.response_from_dict(record["response"]), record["scores"])
+
+        if columns is not None:
+            columns.close()
+
+        if accumulator.count != counts["done"]:
+            raise ValueError(f"Shards hold {accumulator.count} dialogues but the queue finished {counts['done']}")
+
+        summary = accumulator.summary()
+        summary.update(_sum_worker_files(artifacts.shards_dir.glob("*.cache.json")))
+        cpu_seconds = _sum_worker_files(artifacts.shards_dir.glob("*.timings.json"))
+
+        write_summary(artifacts.summary_path, summary)
+        write_summary(artifacts.timings_path, cpu_seconds)
+        self._register(base_dir, artifacts, summary, cpu_seconds, started)
+        return RunResult(artifacts=artifacts, metrics=summary, metric_cpu_seconds=cpu_seconds)
+
+    def _register(self, base_dir: Path, artifacts: RunArtifacts, summary: Dict[str, float], cpu_seconds: Dict[str, float], started: float) -> None:
+        if not self.config.catalog:
+            return
+        paths = {
+            "requests": logging_utils.find_log(artifacts.requests_path),
+            "responses": logging_utils.find_log(artifacts.responses_path),
+            "summary": artifacts.summary_path,
+            "timings": artifacts.timings_path,
+        }
+        if self.config.columnar:
+            paths["columns"] = artifacts.columns_dir
+        if self.config.prompt_dictionary:
+            paths["prompts"] = artifacts.prompts_path
+
+        catalog = RunCatalog(self.config.catalog_path or base_dir / "catalog.sqlite")
+        try:
+            catalog.register(
+                experiment_id=self.config.experiment_id,
+                config_hash=self._config_hash(),
+                model=self.config.model,
+                temperature=self.config.temperature,
+                output_dir=artifacts.output_dir,
+                started=started,
+                summary=summary,
+                cpu_seconds=cpu_seconds,
+                artifacts=paths,
+            )
+        finally:
+            catalog.close()
+
+    def _open_columns(self, artifacts: RunArtifacts, metric_names: Sequence[str]) -> ColumnarWriter | None:
+        # Rewritten in full each run, including the resumed prefix, so it always matches the JSONL logs
+        if not self.config.columnar:
+            return None
+        return ColumnarWriter(artifacts.columns_dir, metric_names)
+
+    def _metric_suite(self) -> metrics.MetricSuite:
+        for module in self.config.metric_plugins:
+            # Plugin modules call metrics.register_metric when imported
+            importlib.import_module(module)
+        return metrics.MetricSuite(self.config.metrics, lambda: dataset.load_dialogues(self.config.dataset_path))
+
+    def _logs(self, sample: dataset.DialogueSample, response: AnthropicResponse) -> Tuple[logging_utils.RequestLog, logging_utils.ResponseLog]:
+        request_log = logging_utils.RequestLog(
+            dialogue_id=sample.dialogue_id,
+            model=self.config.model,
+            temperature=self.config.temperature,
+            max_tokens=self.config.max_tokens,
+            prompt={"system": sample.system, "user": sample.user},
+        )
+        response_log = logging_utils.ResponseLog(
+            dialogue_id=sample.dialogue_id,
+            completion=response.completion,
+            metadata=response.metadata,
+        )
+        return request_log, response_log
+
+    def _log_options(self) -> Dict[str, Any]:
+        return {
+            "fsync": self.config.fsync,
+            "flush_every": self.config.flush_every,
+            "compression": self.config.log_compression,
+            "prompt_dictionary": self.config.prompt_dictionary,
+        }
+
+    def _fingerprint(self) -> str:
+        # Settings that change what gets logged, or how; anything else may differ between resumes
+        identity = [
+            self.config.model,
+            self.config.temperature,
+            self.config.max_tokens,
+            str(self.config.dataset_path),
+            self.config.log_compression,
+            self.config.prompt_dictionary,
+        ]
+        return hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()
+
+    def _config_hash(self) -> str:
+        # The whole config, so runs are only grouped together when nothing differs
+        payload = json.dumps(asdict(self.config), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _open_cache(self, base_dir: Path) -> ResponseCache | None:
+        # Off by default when sampling, so repeated runs still measure fresh samples
+        enabled = self.config.cache if self.config.cache is not None else self.config.temperature == 0
+        if not enabled:
+            return None
+        return ResponseCache(
+            self.config.cache_path or base_dir / "response_cache.sqlite",
+            max_entries=self.config.cache_max_entries,
+            max_bytes=self.config.cache_max_bytes,
+            max_age=self.config.cache_max_age,
+        )
+
+    def _complete(
+        self, samples: Iterable[dataset.DialogueSample], cache: ResponseCache | None
+    ) -> Iterator[Tuple[dataset.DialogueSample, AnthropicResponse, bool | None]]:
+        """Yield `(sample, response, cached)` in dataset order; `cached` is None without a cache."""
+
+        if self.config.batch:
+            batch_client = self.factory.build_batch(
+                model=self.config.model,
+                max_tokens=self.config.max_tokens,
+                temperature=self.config.temperature,
+            )
+            if cache is not None:
+                return CachingClient(batch_client, cache).lookup_many(samples)
+            return ((sample, response, None) for sample, response in batch_client.complete_many(samples))
+
         # Build client (will use real API if key exists, otherwise mock)
         client = self.factory.build_live_or_simulated(
             model=self.config.model,
             max_tokens=self.config.max_tokens,
             temperature=self.config.temperature,
         )
+        if cache is not None:
+            results = ordered_map(CachingClient(client, cache).lookup, samples, self.config.concurrency)
+            return ((sample, response, cached) for sample, (response, cached) in results)
+        return ((sample, response, None) for sample, response in ordered_map(client.complete, samples, self.config.concurrency))
 
-        # Collect data as we go
-        request_logs: List[logging_utils.RequestLog] = []
-        response_logs: List[logging_utils.ResponseLog] = []
-        fact_coverages: List[float] = []
-        refusals: List[bool] = []
-
-        # Main loop: process each dialogue from the dataset
-        for sample in dataset.load_dialogues(self.config.dataset_path):
-            # Log what we're sending
-            request_logs.append(
-                logging_utils.RequestLog(
-                    dialogue_id=sample.dialogue_id,
-                    model=self.config.model,
-                    temperature=self.config.temperature,
-                    max_tokens=self.config.max_tokens,
-                    prompt={"system": sample.system, "user": sample.user},
-                )
-            )
+    def rescore(self, log_dir: str | Path) -> Dict[str, float]:
+        """Recompute the core metrics of an archived run from its responses.
 
-            # Get completion from Claude (or mock)
-            response = client.complete(sample)
+        With numpy installed the built-in metrics are scored and aggregated
+        over whole columns; otherwise, or when the config requests other
+        metrics, each row goes through the metric suite.
+        """
 
-            # Log the response
-            response_logs.append(
-                logging_utils.ResponseLog(
-                    dialogue_id=sample.dialogue_id,
-                    completion=response.completion,
-                    metadata=response.metadata,
-                )
+        samples = list(dataset.load_dialogues(self.config.dataset_path))
+        records = self._logged_responses(Path(log_dir))
+        if len(records) != len(samples):
+            # zip would silently score only the shorter of the two
+            raise ValueError(
+                f"{log_dir} logs {len(records)} responses but the dataset has {len(samples)} dialogues; "
+                "rescore only a finished run of this dataset"
             )
+        rows = list(zip(samples, records))
+        for sample, record in rows:
+            if record.dialogue_id != sample.dialogue_id:
+                raise ValueError(f"Logged dialogue {record.dialogue_id!r} does not match dataset entry {sample.dialogue_id!r}")
 
-            # Calculate per-dialogue metrics
-            fact_coverages.append(metrics.compute_fact_coverage(sample.required_facts, response.completion))
-            refusals.append(metrics.compute_refusal_flag(response.completion, response.metadata))
+        names = self.config.metrics or list(metrics.DEFAULT_METRICS)
+        if metrics.np is not None and set(names) == set(metrics.DEFAULT_METRICS):
+            coverage, refusals = metrics.score_batch(
+                [record.completion for _, record in rows],
+                [record.metadata for _, record in rows],
+                [sample.required_facts for sample, _ in rows],
+            )
+            return metrics.aggregate_arrays(coverage, refusals)
 
-        # Aggregate all metrics
-        summary = metrics.aggregate_metrics(fact_coverages, refusals)
+        suite = self._metric_suite()
+        accumulator = metrics.MetricsAccumulator(suite.names)
+        for sample, record in rows:
+            accumulator.add_scores(suite.score(sample, record.completion, record.metadata))
+        return accumulator.core()
 
-        # Write everything to disk
-        write_requests(artifacts.requests_path, request_logs)
-        write_responses(artifacts.responses_path, response_logs)
-        write_summary(artifacts.summary_path, summary)
+    def _logged_responses(self, log_dir: Path) -> List[logging_utils.ResponseLog]:
+        # The columnar artifact lets rescoring skip every field it does not score
+        columns_dir = log_dir / "responses.columns"
+        if columns_dir.exists():
+            columns = read_columns(columns_dir, ["dialogue_id", "completion", "metadata"])
+            return [
+                logging_utils.ResponseLog(dialogue_id=dialogue_id, completion=completion, metadata=json.loads(metadata))
+                for dialogue_id, completion, metadata in zip(columns["dialogue_id"], columns["completion"], columns["metadata"])
+            ]
 
-        return RunResult(artifacts=artifacts, metrics=summary)
+        responses_path = logging_utils.find_log(log_dir / "responses.jsonl")
+        if not responses_path.exists():
+            raise FileNotFoundError(f"Responses file not found at {responses_path}")
+        return [logging_utils.response_from_dict(payload) for payload in logging_utils.read_jsonl(responses_path)]
 
     def summarize(self, log_dir: str | Path) -> Dict[str, float]:
         summary_path = Path(log_dir) / "summary.json"
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from pathlib import Path
 
-from tasks.experiment_profiler.tools.anthropic_client import AnthropicClient, MockAnthropicClient
+from tasks.experiment_profiler.tools.anthropic_client import AnthropicClient, BatchAnthropicClient, MockAnthropicClient
 
 
 class ClientFactory:
@@ -17,3 +17,7 @@ class ClientFactory:
     def build_live_or_simulated(self, model: str, max_tokens: int, temperature: float) -> AnthropicClient:
         simulator = self.build_simulator()
         return AnthropicClient(model=model, max_tokens=max_tokens, temperature=temperature, simulator=simulator)
+
+    def build_batch(self, model: str, max_tokens: int, temperature: float) -> BatchAnthropicClient:
+        simulator = self.build_simulator()
+        return BatchAnthropicClient(model=model, max_tokens=max_tokens, temperature=temperature, simulator=simulator)
@@ -2,19 +2,29 @@
 
 from __future__ import annotations
 
+import json
+import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from tasks.experiment_profiler.tools import logging_utils
 
+CACHE_COUNTERS = ("cache_hits", "cache_misses")
+
 
 @dataclass
 class RunArtifacts:
     output_dir: Path
     requests_path: Path
     responses_path: Path
+    prompts_path: Path
     summary_path: Path
+    timings_path: Path
+    columns_dir: Path
+    state_path: Path
+    queue_path: Path
+    shards_dir: Path
 
 
 def prepare_output_dir(base_dir: str | Path, experiment_id: str) -> RunArtifacts:
@@ -25,10 +35,153 @@ def prepare_output_dir(base_dir: str | Path, experiment_id: str) -> RunArtifacts
         output_dir=output_dir,
         requests_path=output_dir / "requests.jsonl",
         responses_path=output_dir / "responses.jsonl",
+        prompts_path=output_dir / logging_utils.PROMPT_DICTIONARY_NAME,
         summary_path=output_dir / "summary.json",
+        timings_path=output_dir / "metric_timings.json",
+        columns_dir=output_dir / "responses.columns",
+        state_path=output_dir / "run_state.json",
+        queue_path=output_dir / "queue.sqlite",
+        shards_dir=output_dir / "shards",
     )
 
 
+def resume_run(
+    artifacts: RunArtifacts, fingerprint: str, *, resume: bool = True, compression: str = "none"
+) -> Tuple[int, Dict[str, int]]:
+    """Return how many dialogues the logs already hold and their cache counters, starting over if needed.
+
+    A run is resumed only when `run_state.json` carries the same config
+    fingerprint. Any partially written tail is truncated so both logs end on
+    the same complete record, and never past the record count the counters
+    were saved with, so the counters describe exactly the kept records.
+    Compressed logs cannot be truncated in place, so their complete prefix
+    is rewritten instead.
+    """
+
+    requests_path = logging_utils.log_path(artifacts.requests_path, compression)
+    responses_path = logging_utils.log_path(artifacts.responses_path, compression)
+    if resume and artifacts.state_path.exists():
+        with artifacts.state_path.open("r", encoding="utf-8") as handle:
+            state = json.load(handle)
+        if state.get("fingerprint") == fingerprint and requests_path.exists() and responses_path.exists():
+            limit = state.get("completed")
+            counters = {name: int(state.get(name, 0)) for name in CACHE_COUNTERS}
+            if compression != "none":
+                counts = [logging_utils.count_complete(requests_path), logging_utils.count_complete(responses_path)]
+                completed = min(counts if limit is None else [*counts, limit])
+                logging_utils.rewrite_prefix(requests_path, completed)
+                logging_utils.rewrite_prefix(responses_path, completed)
+                return completed, counters
+
+            completed, _ = _complete_prefix(responses_path, limit=limit)
+            completed, request_offset = _complete_prefix(requests_path, limit=completed)
+            completed, response_offset = _complete_prefix(responses_path, limit=completed)
+            _truncate(requests_path, request_offset)
+            _truncate(responses_path, response_offset)
+            return completed, counters
+
+    counters = dict.fromkeys(CACHE_COUNTERS, 0)
+    save_run_state(artifacts, fingerprint, 0, counters)
+    return 0, counters
+
+
+def save_run_state(artifacts: RunArtifacts, fingerprint: str, completed: int, cache_counts: Dict[str, int]) -> None:
+    """Record how many dialogues are durably logged and the cache counters for them."""
+
+    # Written aside and renamed, so a crash never leaves a half-written state file
+    staging = artifacts.state_path.with_name(f".tmp-{artifacts.state_path.name}")
+    logging_utils.write_summary(staging, {"fingerprint": fingerprint, "completed": completed, **cache_counts})
+    os.replace(staging, artifacts.state_path)
+
+
+def repair_jsonl(path: Path) -> int:
+    """Truncate a torn final record left by a crash and return the complete record count."""
+
+    count, offset = _complete_prefix(path)
+    _truncate(path, offset)
+    return count
+
+
+def _complete_prefix(path: Path, limit: Optional[int] = None) -> Tuple[int, int]:
+    count = offset = 0
+    with path.open("rb") as handle:
+        for line in handle:
+            if limit is not None and count >= limit:
+                break
+            if not line.endswith(b"\n"):
+                break
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            count += 1
+            offset += len(line)
+    return count, offset
+
+
+def _truncate(path: Path, size: int) -> None:
+    with path.open("r+b") as handle:
+        handle.truncate(size)
+
+
+class LogWriter:
+    """Streams request and response records to a run's JSONL logs.
+
+    Each pair is appended as soon as it is produced, so memory stays flat
+    and a crash keeps every record written so far. With `compression` the
+    logs are written as `.jsonl.gz` or `.jsonl.zst`; with
+    `prompt_dictionary` each distinct system prompt is stored once in
+    `prompts.jsonl` and requests refer to it by hash.
+    """
+
+    def __init__(
+        self,
+        artifacts: RunArtifacts,
+        *,
+        fsync: str = "batch",
+        flush_every: int = 1000,
+        append: bool = False,
+        compression: str = "none",
+        prompt_dictionary: bool = False,
+    ) -> None:
+        if not append:
+            # A fresh run replaces the logs in whatever encoding they were left in
+            logging_utils.remove_logs(artifacts.requests_path)
+            logging_utils.remove_logs(artifacts.responses_path)
+            artifacts.prompts_path.unlink(missing_ok=True)
+
+        options = {"fsync": fsync, "flush_every": flush_every, "append": append}
+        self.requests = logging_utils.JsonlWriter(logging_utils.log_path(artifacts.requests_path, compression), **options)
+        self.responses = logging_utils.JsonlWriter(logging_utils.log_path(artifacts.responses_path, compression), **options)
+        self.prompts = logging_utils.PromptDictionary(artifacts.prompts_path, fsync=fsync, append=append) if prompt_dictionary else None
+
+    def write(self, request: logging_utils.RequestLog, response: logging_utils.ResponseLog) -> None:
+        self.write_payloads(logging_utils.request_to_dict(request), logging_utils.response_to_dict(response))
+
+    def write_payloads(self, request: Dict[str, Any], response: Dict[str, Any]) -> None:
+        if self.prompts is not None:
+            request = self.prompts.encode_request(request)
+        self.requests.write(request)
+        self.responses.write(response)
+
+    @property
+    def flushed(self) -> bool:
+        """True right after a write that flushed both logs."""
+        return self.requests.count % self.requests.flush_every == 0
+
+    def close(self) -> None:
+        self.requests.close()
+        self.responses.close()
+        if self.prompts is not None:
+            self.prompts.close()
+
+    def __enter__(self) -> "LogWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
 def write_requests(path: Path, records: Iterable[logging_utils.RequestLog]) -> None:
     payloads = [logging_utils.request_to_dict(record) for record in records]
     logging_utils.write_jsonl(path, payloads)
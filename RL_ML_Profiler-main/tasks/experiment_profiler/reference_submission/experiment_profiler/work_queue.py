@@ -0,0 +1,165 @@
+"""Shared work queue and log shards for multi-process runs (reference implementation)."""
+
+from __future__ import annotations
+
+import heapq
+import json
+import shutil
+import sqlite3
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from tasks.experiment_profiler.tools import dataset, logging_utils
+
+
+class WorkQueue:
+    """SQLite-backed queue of dialogues shared by worker processes.
+
+    Every dialogue is stored with its position in the dataset. Workers claim
+    the lowest pending positions under `BEGIN IMMEDIATE`, which serialises
+    claims across processes, and hold them on a lease. A claim whose lease
+    expires (for example because its worker died) becomes claimable again.
+    Hosts sharing the queue need a filesystem with working POSIX locks.
+    """
+
+    def __init__(self, path: Path, *, lease_seconds: float = 600.0) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # The default rollback journal, not WAL: WAL needs shared memory, which
+        # hosts on a network filesystem do not have
+        self._conn = sqlite3.connect(str(path), timeout=60.0, isolation_level=None)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                seq INTEGER PRIMARY KEY,
+                sample TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def populate(self, samples: Iterable[dataset.DialogueSample], fingerprint: str) -> None:
+        """Load the dataset into the queue unless another worker already has.
+
+        The queue remembers the config fingerprint it was populated for, and
+        workers with a different config are refused rather than mixing their
+        records into the same shards.
+        """
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'populated'").fetchone() is None:
+                self._conn.executemany(
+                    "INSERT INTO tasks (seq, sample) VALUES (?, ?)",
+                    ((seq, json.dumps(asdict(sample), ensure_ascii=False)) for seq, sample in enumerate(samples)),
+                )
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('populated', ?)", (repr(time.time()),))
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self.check_fingerprint(fingerprint)
+
+    def check_fingerprint(self, fingerprint: str) -> None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is None or row[0] != fingerprint:
+            raise ValueError(f"The work queue at {self.path} was created for a different config; rerun with --fresh")
+
+    def claim(self, worker_id: str, limit: int) -> List[Tuple[int, dataset.DialogueSample]]:
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._conn.execute(
+                """
+                SELECT seq, sample FROM tasks
+                WHERE status = 'pending' OR (status = 'claimed' AND lease_until < ?)
+                ORDER BY seq LIMIT ?
+                """,
+                (now, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE tasks SET status = 'claimed', worker = ?, lease_until = ? WHERE seq = ?",
+                [(worker_id, now + self.lease_seconds, seq) for seq, _ in rows],
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return [(seq, dataset.DialogueSample(**json.loads(sample))) for seq, sample in rows]
+
+    def complete(self, seqs: List[int]) -> None:
+        self._conn.execute("BEGIN IMMEDIATE")
+        self._conn.executemany("UPDATE tasks SET status = 'done', lease_until = NULL WHERE seq = ?", [(seq,) for seq in seqs])
+        self._conn.execute("COMMIT")
+
+    def populated_at(self) -> float | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'populated'").fetchone()
+        return None if row is None else float(row[0])
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def reset(queue_path: Path, shards_dir: Path) -> None:
+    """Delete the queue and every shard so the next worker starts a new run."""
+
+    for path in (queue_path, queue_path.with_name(queue_path.name + "-journal")):
+        path.unlink(missing_ok=True)
+    if shards_dir.exists():
+        shutil.rmtree(shards_dir)
+
+
+def merge_shards(shard_paths: List[Path]) -> Iterator[Dict[str, Any]]:
+    """Yield shard records in dataset order, dropping duplicates.
+
+    A dialogue can appear twice if its lease expired while the first worker
+    was still busy; both copies are equivalent, so the first one wins. Each
+    shard is indexed by (seq, offset) so records are read back one at a time.
+    """
+
+    handles = [path.open("rb") for path in shard_paths]
+    try:
+        indexes = [[(seq, shard, offset) for seq, offset in _index_shard(handle)] for shard, handle in enumerate(handles)]
+        merged = heapq.merge(*indexes)
+        last_seq = None
+        for seq, shard, offset in merged:
+            if seq == last_seq:
+                continue
+            last_seq = seq
+            handles[shard].seek(offset)
+            yield json.loads(handles[shard].readline())
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def _index_shard(handle: Any) -> List[Tuple[int, int]]:
+    index = []
+    offset = 0
+    for line in handle:
+        if not line.endswith(b"\n"):
+            break
+        index.append((json.loads(line)["seq"], offset))
+        offset += len(line)
+    index.sort()
+    return index
+
+
+def shard_record(seq: int, request: logging_utils.RequestLog, response: logging_utils.ResponseLog, scores: Dict[str, float]) -> Dict[str, Any]:
+    return {
+        "seq": seq,
+        "request": logging_utils.request_to_dict(request),
+        "response": logging_utils.response_to_dict(response),
+        "scores": scores,
+    }
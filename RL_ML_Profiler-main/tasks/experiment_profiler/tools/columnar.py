@@ -0,0 +1,141 @@
+"""Columnar, typed response artifacts for analytics over finished runs."""
+
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+try:  # pragma: no cover - optional dependency, preferred when installed
+    import pyarrow as pa  # type: ignore
+    import pyarrow.ipc  # type: ignore  # noqa: F401
+except Exception:  # pragma: no cover
+    pa = None  # type: ignore
+
+try:  # pragma: no cover - optional dependency used as the fallback
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+from .logging_utils import ResponseLog
+
+# Fixed columns; scores add one float column per metric as `score_<name>`.
+# `metadata` holds the full metadata as JSON so nothing is lost.
+STRING_COLUMNS = ("dialogue_id", "completion", "model", "metadata")
+FLOAT_COLUMNS = ("temperature",)
+INT_COLUMNS = ("token_count",)
+
+# `.npz` members holding a string column's byte offsets and UTF-8 data
+_OFFSETS = "__offsets"
+_DATA = "__data"
+
+
+class ColumnarWriter:
+    """Writes response records as typed column chunks.
+
+    Rows are buffered and written every `chunk_rows` records as one chunk
+    file: an Arrow IPC file (`.arrow`) when pyarrow is installed, otherwise
+    an `.npz` archive with one NumPy array per column. Readers load only the
+    columns they ask for.
+    """
+
+    def __init__(self, directory: Path, score_names: Sequence[str], *, chunk_rows: int = 10_000) -> None:
+        if pa is None and np is None:
+            raise ImportError("Columnar artifacts need pyarrow or numpy; install the 'fast' extra")
+
+        # Chunks always describe the run being written, never a previous one
+        if directory.exists():
+            shutil.rmtree(directory)
+        directory.mkdir(parents=True)
+
+        self.directory = directory
+        self.score_columns = [f"score_{name}" for name in score_names]
+        self.chunk_rows = chunk_rows
+        self._chunks = 0
+        self._rows: Dict[str, List[Any]] = self._empty()
+
+    def _empty(self) -> Dict[str, List[Any]]:
+        names = [*STRING_COLUMNS, *FLOAT_COLUMNS, *INT_COLUMNS, *self.score_columns]
+        return {name: [] for name in names}
+
+    def write(self, response: ResponseLog, scores: Dict[str, float]) -> None:
+        metadata = response.metadata
+        self._rows["dialogue_id"].append(response.dialogue_id)
+        self._rows["completion"].append(response.completion)
+        self._rows["model"].append(str(metadata.get("model", "")))
+        self._rows["metadata"].append(json.dumps(metadata, ensure_ascii=False, sort_keys=True))
+        self._rows["temperature"].append(float(metadata.get("temperature", float("nan"))))
+        self._rows["token_count"].append(int(metadata.get("token_count", 0)))
+        for name, value in scores.items():
+            self._rows[f"score_{name}"].append(float(value))
+
+        if len(self._rows["dialogue_id"]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._rows["dialogue_id"]:
+            return
+        stem = self.directory / f"chunk-{self._chunks:05d}"
+        if pa is not None:
+            self._write_arrow(stem.with_suffix(".arrow"))
+        else:
+            self._write_npz(stem.with_suffix(".npz"))
+        self._chunks += 1
+        self._rows = self._empty()
+
+    def _write_arrow(self, path: Path) -> None:
+        fields = [(name, pa.string()) for name in STRING_COLUMNS]
+        fields += [(name, pa.float64()) for name in (*FLOAT_COLUMNS, *self.score_columns)]
+        fields += [(name, pa.int64()) for name in INT_COLUMNS]
+        schema = pa.schema(fields)
+        batch = pa.RecordBatch.from_pydict(self._rows, schema=schema)
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            writer.write_batch(batch)
+
+    def _write_npz(self, path: Path) -> None:
+        # Strings are stored as one UTF-8 buffer plus offsets: NumPy's fixed-width
+        # unicode arrays pad every row to the longest one and drop trailing NULs
+        arrays: Dict[str, Any] = {}
+        for name in STRING_COLUMNS:
+            encoded = [value.encode("utf-8") for value in self._rows[name]]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            arrays[f"{name}{_OFFSETS}"] = offsets
+            arrays[f"{name}{_DATA}"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        arrays.update({name: np.array(self._rows[name], dtype=np.float64) for name in (*FLOAT_COLUMNS, *self.score_columns)})
+        arrays.update({name: np.array(self._rows[name], dtype=np.int64) for name in INT_COLUMNS})
+        np.savez(path, **arrays)
+
+    def close(self) -> None:
+        self.flush()
+
+
+def read_columns(directory: Path, columns: Sequence[str]) -> Dict[str, List[Any]]:
+    """Read the named columns from every chunk, in row order.
+
+    Arrow chunks are memory-mapped and `.npz` members are loaded lazily, so
+    columns that are not requested are never decoded.
+    """
+
+    values: Dict[str, List[Any]] = {name: [] for name in columns}
+    for path in sorted(directory.glob("chunk-*")):
+        if path.suffix == ".arrow":
+            if pa is None:
+                raise ImportError(f"Reading {path} requires pyarrow")
+            with pa.memory_map(str(path), "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+                for name in columns:
+                    values[name].extend(table.column(name).to_pylist())
+        elif path.suffix == ".npz":
+            if np is None:
+                raise ImportError(f"Reading {path} requires numpy")
+            with np.load(path) as archive:
+                for name in columns:
+                    if f"{name}{_OFFSETS}" in archive.files:
+                        data = archive[f"{name}{_DATA}"].tobytes()
+                        offsets = archive[f"{name}{_OFFSETS}"].tolist()
+                        values[name].extend(data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:]))
+                    else:
+                        values[name].extend(archive[name].tolist())
+    return values
@@ -2,10 +2,20 @@
 
 from __future__ import annotations
 
+import glob
 import json
+import mmap
+import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Union
+
+DatasetSource = Union[str, Path, Sequence[Union[str, Path]]]
+
+JSONL_SUFFIXES = {".jsonl", ".ndjson"}
+READ_CHUNK_CHARS = 1 << 20
+
+_DECODER = json.JSONDecoder()
 
 
 @dataclass(frozen=True)
@@ -16,14 +26,91 @@ class DialogueSample:
     required_facts: List[str]
 
 
-def load_dialogues(path: str | Path) -> Iterable[DialogueSample]:
+def load_dialogues(path: DatasetSource) -> Iterable[DialogueSample]:
+    """Yield dialogues one at a time from a file, directory, glob or list of shards.
+
+    `.jsonl`/`.ndjson` files are read line by line through a memory map; any
+    other file must hold a JSON array, which is decoded element by element.
+    Shards are read in sorted order, so a dataset split across
+    `part-000.jsonl`, `part-001.jsonl`, ... keeps its order.
+    """
+
+    for shard in expand_shards(path):
+        records = _iter_jsonl(shard) if shard.suffix in JSONL_SUFFIXES else _iter_json_array(shard)
+        for item in records:
+            yield DialogueSample(
+                dialogue_id=item["dialogue_id"],
+                system=item["system"],
+                user=item["user"],
+                required_facts=list(item.get("required_facts", [])),
+            )
+
+
+def expand_shards(path: DatasetSource) -> List[Path]:
+    if not isinstance(path, (str, Path)):
+        return [shard for entry in path for shard in expand_shards(entry)]
+
+    path = Path(path).expanduser()
+    if path.is_dir():
+        return sorted(child for child in path.iterdir() if child.suffix in JSONL_SUFFIXES | {".json"})
+    if glob.has_magic(str(path)):
+        matches = sorted(Path(match) for match in glob.glob(str(path)))
+        if not matches:
+            raise FileNotFoundError(f"No dataset shards match {path}")
+        return matches
+    return [path]
+
+
+def _iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b""):
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _iter_json_array(path: Path) -> Iterator[Dict[str, Any]]:
     with open(path, "r", encoding="utf-8") as handle:
-        data = json.load(handle)
-
-    for item in data:
-        yield DialogueSample(
-            dialogue_id=item["dialogue_id"],
-            system=item["system"],
-            user=item["user"],
-            required_facts=list(item.get("required_facts", [])),
-        )
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = handle.read(READ_CHUNK_CHARS)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return not eof
+
+        def skip(chars: str) -> str:
+            # Advance past `chars` and return the next significant character ("" at EOF)
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in chars:
+                    pos += 1
+                if pos < len(buffer) or not fill():
+                    return buffer[pos:pos + 1]
+
+        if skip(" \t\r\n") != "[":
+            raise ValueError(f"{path} must contain a JSON array of dialogues")
+        pos += 1
+
+        while True:
+            token = skip(" \t\r\n,")
+            if token == "]":
+                return
+            if token == "":
+                raise ValueError(f"{path} ended before the closing bracket")
+
+            # Decode one element, reading more text if it spans the chunk boundary
+            while True:
+                try:
+                    item, pos = _DECODER.raw_decode(buffer, pos)
+                    break
+                except json.JSONDecodeError:
+                    if not fill():
+                        raise
+            yield item
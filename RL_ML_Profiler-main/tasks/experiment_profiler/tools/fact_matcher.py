@@ -0,0 +1,81 @@
+"""Multi-pattern fact matching for fact coverage scoring."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+try:  # pragma: no cover - optional C automaton for datasets with many facts
+    import ahocorasick  # type: ignore
+except Exception:  # pragma: no cover
+    ahocorasick = None  # type: ignore
+
+# Average facts per dialogue above which one automaton scan beats a substring
+# check per fact. Measured on 2,000 ~1,600-char completions: `fact in text`
+# runs in C and wins below ~170 facts even against pyahocorasick. A
+# pure-Python automaton never caught up at any size, so without pyahocorasick
+# fact coverage always uses substring checks.
+MATCHER_MIN_FACTS = 200
+
+
+def build_matcher(fact_lists: Iterable[Sequence[str]]) -> Optional["FactMatcher"]:
+    """Return a matcher when pyahocorasick is installed and the facts clear the threshold, else None."""
+
+    if ahocorasick is None:
+        return None
+    facts: List[str] = []
+    dialogues = 0
+    for required_facts in fact_lists:
+        facts.extend(required_facts)
+        dialogues += 1
+    if not dialogues or len(facts) / dialogues < MATCHER_MIN_FACTS:
+        return None
+    return FactMatcher(facts)
+
+
+class FactMatcher:
+    """
+    Aho-Corasick automaton over the lowercased required facts of a dataset.
+    Each completion is lowercased and scanned once, however many facts there
+    are, and the results agree with case-insensitive substring checks.
+    Requires pyahocorasick (the `matcher` extra).
+    """
+
+    def __init__(self, facts: Iterable[str]) -> None:
+        if ahocorasick is None:
+            raise ImportError("FactMatcher needs pyahocorasick; install the `matcher` extra")
+        self._patterns: Dict[str, int] = {}
+        self._automaton = ahocorasick.Automaton()
+        for fact in facts:
+            pattern = fact.lower()
+            if pattern and pattern not in self._patterns:
+                self._patterns[pattern] = len(self._patterns)
+                self._automaton.add_word(pattern, self._patterns[pattern])
+        if self._patterns:
+            self._automaton.make_automaton()
+
+    def matches(self, completion: str) -> Set[int]:
+        """Return the ids of every known fact that occurs in the completion."""
+        return self._scan(completion.lower())
+
+    def _scan(self, text: str) -> Set[int]:
+        if not self._patterns:
+            return set()
+        return {pattern_id for _, pattern_id in self._automaton.iter(text)}
+
+    def hit_vector(self, required_facts: Iterable[str], completion: str) -> List[bool]:
+        """Per-fact hits, in the order the facts are listed."""
+        return self.lowered_hit_vector(required_facts, completion.lower())
+
+    def lowered_hit_vector(self, required_facts: Iterable[str], lowered: str) -> List[bool]:
+        """`hit_vector` for a completion the caller has already lowercased."""
+        found = self._scan(lowered)
+        hits = []
+        for fact in required_facts:
+            pattern = fact.lower()
+            pattern_id = self._patterns.get(pattern)
+            if pattern_id is not None:
+                hits.append(pattern_id in found)
+            else:
+                # Empty facts, or facts this matcher was not built with
+                hits.append(pattern in lowered)
+        return hits
@@ -2,10 +2,31 @@
 
 from __future__ import annotations
 
+import gzip
+import hashlib
+import io
 import json
+import os
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+try:  # pragma: no cover - optional dependency for zstd-compressed logs
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+FSYNC_POLICIES = ("never", "batch", "always")
+
+# Log compression name -> file suffix appended after ".jsonl"
+LOG_COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+PROMPT_DICTIONARY_NAME = "prompts.jsonl"
+PROMPT_REF_KEY = "$ref"
+
+# Errors raised when a compressed stream ends mid-record, e.g. after a crash
+_TRUNCATION_ERRORS: Tuple[type, ...] = (EOFError, OSError, ValueError)
+if zstandard is not None:  # pragma: no cover
+    _TRUNCATION_ERRORS += (zstandard.ZstdError,)
 
 
 @dataclass
@@ -31,6 +52,198 @@ def write_jsonl(path: Path, records: Iterable[Dict[str, Any]]) -> None:
             handle.write(json.dumps(record, ensure_ascii=False) + "\n")
 
 
+class JsonlWriter:
+    """Appends JSONL records to a file as they are produced.
+
+    Records go through a buffered file handle that is flushed every
+    `flush_every` records. `fsync` controls durability: "never" leaves
+    syncing to the OS, "batch" syncs on every flush, and "always" flushes
+    and syncs after each record.
+    """
+
+    def __init__(self, path: Path, *, fsync: str = "batch", flush_every: int = 1000, append: bool = False) -> None:
+        # The encoding follows the suffix: `.jsonl.gz` and `.jsonl.zst` are
+        # compressed as a stream, and every flush leaves a decodable prefix
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}; expected one of {', '.join(FSYNC_POLICIES)}")
+        if flush_every < 1:
+            raise ValueError("flush_every must be at least 1")
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.fsync = fsync
+        self.flush_every = 1 if fsync == "always" else flush_every
+        self.count = 0
+        self._handle = _open_text(path, "a" if append else "w")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        self._handle.flush()
+        if self.fsync != "never":
+            os.fsync(self._handle.fileno())
+
+    def close(self) -> None:
+        if self._handle.closed:
+            return
+        self.flush()
+        self._handle.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def read_jsonl(path: Path, *, tolerant: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield records one line at a time without loading the whole file.
+
+    `path` may name the plain log; a compressed variant is found and decoded
+    transparently, and prompts stored in the side dictionary are resolved.
+    With `tolerant`, a torn final record is skipped instead of raising.
+    """
+
+    path = find_log(path)
+    dictionary: Optional[Dict[str, str]] = None
+    for line in _iter_lines(path, tolerant=tolerant):
+        if tolerant and not line.endswith("\n"):
+            return
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            if tolerant:
+                return
+            raise
+
+        prompt = record.get("prompt")
+        if isinstance(prompt, dict) and any(isinstance(value, dict) and PROMPT_REF_KEY in value for value in prompt.values()):
+            if dictionary is None:
+                dictionary = load_prompt_dictionary(path.parent / PROMPT_DICTIONARY_NAME)
+            record["prompt"] = {
+                key: dictionary[value[PROMPT_REF_KEY]] if isinstance(value, dict) and PROMPT_REF_KEY in value else value
+                for key, value in prompt.items()
+            }
+        yield record
+
+
+def log_path(path: Path, compression: str) -> Path:
+    if compression not in LOG_COMPRESSIONS:
+        raise ValueError(f"Unknown log compression {compression!r}; expected one of {', '.join(LOG_COMPRESSIONS)}")
+    return path.with_name(path.name + LOG_COMPRESSIONS[compression])
+
+
+def find_log(path: Path) -> Path:
+    """Return whichever encoding of the log at `path` exists (the plain path if none does)."""
+
+    for suffix in LOG_COMPRESSIONS.values():
+        candidate = path.with_name(path.name + suffix)
+        if candidate.exists():
+            return candidate
+    return path
+
+
+def remove_logs(path: Path) -> None:
+    for suffix in LOG_COMPRESSIONS.values():
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def count_complete(path: Path) -> int:
+    return sum(1 for _ in _complete_lines(path))
+
+
+def rewrite_prefix(path: Path, count: int) -> None:
+    """Keep only the first `count` complete records of a (possibly compressed) log."""
+
+    # The staging name keeps the suffix, so it is written in the same encoding
+    staging = path.with_name(f".tmp-{path.name}")
+    with _open_text(staging, "w") as handle:
+        for index, line in enumerate(_complete_lines(path)):
+            if index >= count:
+                break
+            handle.write(line)
+    os.replace(staging, path)
+
+
+def _complete_lines(path: Path) -> Iterator[str]:
+    for line in _iter_lines(path, tolerant=True):
+        if not line.endswith("\n"):
+            return
+        try:
+            json.loads(line)
+        except ValueError:
+            return
+        yield line
+
+
+def _iter_lines(path: Path, *, tolerant: bool) -> Iterator[str]:
+    with _open_text(path, "r") as handle:
+        try:
+            for line in handle:
+                yield line
+        except _TRUNCATION_ERRORS:
+            if not tolerant:
+                raise
+
+
+def _open_text(path: Path, mode: str) -> IO[str]:
+    if path.name.endswith(LOG_COMPRESSIONS["gzip"]):
+        return gzip.open(path, mode + "t", encoding="utf-8")  # type: ignore[return-value]
+    if path.name.endswith(LOG_COMPRESSIONS["zstd"]):
+        if zstandard is None:
+            raise ImportError(f"{path} is zstd-compressed; install the zstandard package")
+        if mode == "r":
+            raw = zstandard.ZstdDecompressor().stream_reader(path.open("rb"), read_across_frames=True, closefd=True)
+        else:
+            raw = zstandard.ZstdCompressor().stream_writer(path.open(mode + "b"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+class PromptDictionary:
+    """Side file storing each distinct prompt string once, keyed by its hash.
+
+    Request records then carry `{"$ref": "sha256:..."}` in place of the
+    repeated text; `read_jsonl` swaps the text back in. Each new entry is
+    flushed before any record can refer to it.
+    """
+
+    def __init__(self, path: Path, *, fsync: str = "batch", append: bool = False) -> None:
+        self._known: Set[str] = set()
+        if append and path.exists():
+            count = count_complete(path)
+            rewrite_prefix(path, count)
+            self._known.update(load_prompt_dictionary(path))
+        self._writer = JsonlWriter(path, fsync=fsync, flush_every=1, append=append)
+
+    def encode(self, text: str) -> Dict[str, str]:
+        key = "sha256:" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if key not in self._known:
+            self._writer.write({"hash": key, "text": text})
+            self._known.add(key)
+        return {PROMPT_REF_KEY: key}
+
+    def encode_request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Only the system prompt repeats across dialogues; user turns are unique
+        prompt = dict(payload["prompt"])
+        if isinstance(prompt.get("system"), str):
+            prompt["system"] = self.encode(prompt["system"])
+        return {**payload, "prompt": prompt}
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def load_prompt_dictionary(path: Path) -> Dict[str, str]:
+    return {record["hash"]: record["text"] for record in read_jsonl(path, tolerant=True)}
+
+
 def write_summary(path: Path, summary: Dict[str, Any]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("w", encoding="utf-8") as handle:
@@ -48,3 +261,8 @@ def response_to_dict(response: ResponseLog) -> Dict[str, Any]:
     }
     payload.update(response.metadata)
     return payload
+
+
+def response_from_dict(payload: Dict[str, Any]) -> ResponseLog:
+    metadata = {key: value for key, value in payload.items() if key not in {"dialogue_id", "completion"}}
+    return ResponseLog(dialogue_id=payload["dialogue_id"], completion=payload.get("completion", ""), metadata=metadata)
@@ -3,14 +3,35 @@
 from __future__ import annotations
 
 import math
-from typing import Dict, Iterable, List
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
+try:  # pragma: no cover - optional dependency for batch scoring
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
 
-def compute_fact_coverage(required_facts: Iterable[str], completion: str) -> float:
+from .dataset import DialogueSample
+from .fact_matcher import FactMatcher, build_matcher
+
+DEFAULT_METRICS = ("fact_coverage", "refusal_rate")
+COVERAGE_PERCENTILES = (10, 50, 90)
+REFUSAL_PHRASES = ("i'm sorry", "cannot comply")
+
+
+def compute_fact_coverage(required_facts: Iterable[str], completion: str, matcher: Optional[FactMatcher] = None) -> float:
     """
     Calculate what fraction of required facts appear in the completion.
-    Uses case-insensitive substring matching.
+    Uses case-insensitive substring matching, through `matcher` when one is
+    given so the completion is scanned once for all facts.
     """
+    if matcher is not None:
+        hits = matcher.hit_vector(required_facts, completion)
+        # Edge case: if no facts required, give perfect score
+        return sum(hits) / len(hits) if hits else 1.0
+
     facts = [fact.lower() for fact in required_facts]
     completion_lower = completion.lower()
     hits = sum(1 for fact in facts if fact in completion_lower)
@@ -27,13 +48,16 @@ def compute_refusal_flag(completion: str, metadata: Dict[str, str]) -> bool:
     Check if the model refused to answer.
     Looks for explicit refusal markers or common refusal phrases.
     """
+    return _is_refusal(completion.lower(), metadata)
+
+
+def _is_refusal(lowered: str, metadata: Dict[str, Any]) -> bool:
     # Check metadata first (more reliable)
     if metadata.get("type") == "refusal":
         return True
 
     # Fall back to heuristic detection
-    lowered = completion.lower()
-    return "i'm sorry" in lowered or "cannot comply" in lowered
+    return any(phrase in lowered for phrase in REFUSAL_PHRASES)
 
 
 def aggregate_metrics(fact_coverages: List[float], refusals: List[bool]) -> Dict[str, float]:
@@ -44,11 +68,61 @@ def aggregate_metrics(fact_coverages: List[float], refusals: List[bool]) -> Dict
     if not fact_coverages:
         raise ValueError("No fact coverage values provided")
 
-    coverage_mean = sum(fact_coverages) / len(fact_coverages)
-    refusal_rate = sum(1 for flag in refusals if flag) / len(refusals)
+    # The lists are averaged independently, as before, even if their lengths differ
+    accumulator = MetricsAccumulator()
+    for coverage in fact_coverages:
+        accumulator.add_scores({"fact_coverage": coverage})
+    for refusal in refusals:
+        accumulator.add_scores({"refusal_rate": 1.0 if refusal else 0.0})
+    return accumulator.core()
+
+
+def score_batch(
+    completions: Sequence[str],
+    metadata: Sequence[Dict[str, Any]],
+    required_facts: Sequence[Sequence[str]],
+    matcher: Optional[FactMatcher] = None,
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Score columns of rows into float coverage and bool refusal arrays.
+    Matches `compute_fact_coverage`/`compute_refusal_flag` row for row; requires numpy.
+
+    The string checks are one Python pass over the rows, lowercasing each
+    completion once for both metrics; only counting and division are numpy.
+    """
+    if np is None:
+        raise ImportError("score_batch requires numpy; install the 'fast' extra")
+    if not len(completions) == len(metadata) == len(required_facts):
+        raise ValueError("completions, metadata and required_facts must have the same length")
+
+    hit_counts: List[int] = []
+    refusals: List[bool] = []
+    for facts, completion, meta in zip(required_facts, completions, metadata):
+        lowered = completion.lower()
+        if matcher is not None:
+            hit_counts.append(sum(matcher.lowered_hit_vector(facts, lowered)))
+        else:
+            hit_counts.append(sum(1 for fact in facts if fact.lower() in lowered))
+        refusals.append(_is_refusal(lowered, meta))
+
+    fact_counts = np.fromiter((len(facts) for facts in required_facts), dtype=np.int64, count=len(required_facts))
+    coverage = np.ones(len(completions), dtype=np.float64)
+    has_facts = fact_counts > 0
+    coverage[has_facts] = np.asarray(hit_counts, dtype=np.int64)[has_facts] / fact_counts[has_facts]
+    return coverage, np.asarray(refusals, dtype=bool)
+
+
+def aggregate_arrays(coverage: "np.ndarray", refusals: "np.ndarray") -> Dict[str, float]:
+    """
+    Vectorized `aggregate_metrics` over the arrays from `score_batch`.
+    """
+    if np is None:
+        raise ImportError("aggregate_arrays requires numpy; install the 'fast' extra")
+    if coverage.size == 0:
+        raise ValueError("No fact coverage values provided")
 
-    # Geometric mean balances coverage and non-refusal
-    # High refusal rate hurts the score even with good coverage
+    coverage_mean = float(np.mean(coverage))
+    refusal_rate = float(np.count_nonzero(refusals)) / refusals.size
     geometric_mean = math.sqrt(max(coverage_mean * (1 - refusal_rate), 0.0))
 
     return {
@@ -56,3 +130,240 @@ def aggregate_metrics(fact_coverages: List[float], refusals: List[bool]) -> Dict
         "refusal_rate": round(refusal_rate, 4),
         "geometric_mean": round(geometric_mean, 4),
     }
+
+
+@dataclass
+class StreamingStats:
+    """
+    Running count, mean and variance (Welford) of a stream of values.
+    `total` is summed in arrival order so means match `sum(values) / len(values)`.
+    """
+
+    count: int = 0
+    total: float = 0.0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: "StreamingStats") -> None:
+        # Chan et al. parallel combination of two partial aggregates
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.total += other.total
+        self.count = count
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def confidence_interval(self, confidence: float = 0.95) -> Tuple[float, float]:
+        """Normal-approximation interval for the mean."""
+        if self.count == 0:
+            return 0.0, 0.0
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        margin = z * math.sqrt(self.variance / self.count)
+        mean = self.total / self.count
+        return mean - margin, mean + margin
+
+
+@dataclass
+class QuantileSketch:
+    """
+    Fixed-width histogram over [low, high] that answers quantile queries.
+    Each bin also tracks the smallest and largest value it received, so
+    quantiles are exact whenever a bin holds a single distinct value (as
+    with the few coverage levels of a small fact list) and otherwise lie
+    within one bin width. Merging is exact.
+    """
+
+    bins: int = 10_000
+    low: float = 0.0
+    high: float = 1.0
+    counts: List[int] = field(default_factory=list)
+    minimums: List[float] = field(default_factory=list)
+    maximums: List[float] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * self.bins
+        if not self.minimums:
+            self.minimums = [math.inf] * self.bins
+        if not self.maximums:
+            self.maximums = [-math.inf] * self.bins
+
+    def add(self, value: float) -> None:
+        position = (value - self.low) / (self.high - self.low)
+        index = min(max(int(position * self.bins), 0), self.bins - 1)
+        self.counts[index] += 1
+        self.minimums[index] = min(self.minimums[index], value)
+        self.maximums[index] = max(self.maximums[index], value)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if (other.bins, other.low, other.high) != (self.bins, self.low, self.high):
+            raise ValueError("Cannot merge sketches with different bin layouts")
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.minimums = [min(mine, theirs) for mine, theirs in zip(self.minimums, other.minimums)]
+        self.maximums = [max(mine, theirs) for mine, theirs in zip(self.maximums, other.maximums)]
+
+    def quantile(self, q: float) -> float:
+        """The value at rank `floor(q * (n - 1))` of the sorted stream."""
+        total = sum(self.counts)
+        if total == 0:
+            raise ValueError("Cannot take a quantile of an empty sketch")
+        rank = int(q * (total - 1))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count > rank:
+                # Interpolate by rank between the bin's observed extremes
+                low, high = float(self.minimums[index]), float(self.maximums[index])
+                if count == 1:
+                    return low
+                return low + (high - low) * (rank - seen) / (count - 1)
+            seen += count
+        return self.high
+
+
+def wilson_interval(successes: float, trials: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """Wilson score interval for a proportion, which stays inside [0, 1]."""
+    if trials == 0:
+        return 0.0, 1.0
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / trials
+    denominator = 1 + z**2 / trials
+    center = (p + z**2 / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z**2 / (4 * trials**2)) / denominator
+    return max(center - margin, 0.0), min(center + margin, 1.0)
+
+
+class MetricsAccumulator:
+    """
+    Per-dialogue metric state that updates in O(1) and merges across shards.
+    `core()` reproduces `aggregate_metrics`; `summary()` adds intervals and percentiles.
+    """
+
+    def __init__(self, names: Sequence[str] = DEFAULT_METRICS) -> None:
+        self.stats = {name: StreamingStats() for name in names}
+        self.coverage_sketch = QuantileSketch()
+
+    @property
+    def count(self) -> int:
+        return max((stats.count for stats in self.stats.values()), default=0)
+
+    def add(self, coverage: float, refusal: bool) -> None:
+        self.add_scores({"fact_coverage": coverage, "refusal_rate": 1.0 if refusal else 0.0})
+
+    def add_scores(self, scores: Dict[str, float]) -> None:
+        for name, value in scores.items():
+            self.stats[name].add(value)
+        if "fact_coverage" in scores:
+            self.coverage_sketch.add(scores["fact_coverage"])
+
+    def merge(self, other: "MetricsAccumulator") -> None:
+        for name, stats in other.stats.items():
+            self.stats.setdefault(name, StreamingStats()).merge(stats)
+        self.coverage_sketch.merge(other.coverage_sketch)
+
+    def core(self) -> Dict[str, float]:
+        if self.count == 0:
+            raise ValueError("No fact coverage values provided")
+
+        summary = {name: round(stats.total / stats.count, 4) for name, stats in self.stats.items()}
+        if "fact_coverage" in self.stats and "refusal_rate" in self.stats:
+            coverage_mean = self.stats["fact_coverage"].total / self.stats["fact_coverage"].count
+            refusal_rate = self.stats["refusal_rate"].total / self.stats["refusal_rate"].count
+
+            # Geometric mean balances coverage and non-refusal
+            # High refusal rate hurts the score even with good coverage
+            geometric_mean = math.sqrt(max(coverage_mean * (1 - refusal_rate), 0.0))
+            summary["geometric_mean"] = round(geometric_mean, 4)
+        return summary
+
+    def summary(self, confidence: float = 0.95) -> Dict[str, float]:
+        summary = self.core()
+        summary["dialogue_count"] = self.count
+        for name, stats in self.stats.items():
+            if name == "refusal_rate":
+                low, high = wilson_interval(stats.total, stats.count, confidence)
+            else:
+                low, high = stats.confidence_interval(confidence)
+                summary[f"{name}_stddev"] = round(math.sqrt(stats.variance), 4)
+            if name == "fact_coverage":
+                low, high = max(low, 0.0), min(high, 1.0)
+            summary[f"{name}_ci_low"] = round(low, 4)
+            summary[f"{name}_ci_high"] = round(high, 4)
+
+        if "fact_coverage" in self.stats:
+            for percentile in COVERAGE_PERCENTILES:
+                summary[f"fact_coverage_p{percentile}"] = round(self.coverage_sketch.quantile(percentile / 100), 4)
+        return summary
+
+
+# Each builder receives a callable that re-reads the dataset and returns the
+# per-dialogue scorer. Builders run only for metrics a config requests, so
+# expensive setup (like compiling every fact) is skipped when unused.
+Scorer = Callable[[DialogueSample, str, Dict[str, Any]], float]
+MetricBuilder = Callable[[Callable[[], Iterable[DialogueSample]]], Scorer]
+
+METRIC_REGISTRY: Dict[str, MetricBuilder] = {}
+
+
+def register_metric(name: str) -> Callable[[MetricBuilder], MetricBuilder]:
+    """
+    Register a metric builder under `name` so configs can request it.
+    """
+    def decorator(builder: MetricBuilder) -> MetricBuilder:
+        METRIC_REGISTRY[name] = builder
+        return builder
+
+    return decorator
+
+
+@register_metric("fact_coverage")
+def _build_fact_coverage(samples: Callable[[], Iterable[DialogueSample]]) -> Scorer:
+    # Substring checks unless the dataset has enough facts per dialogue for one automaton scan to win
+    matcher = build_matcher(sample.required_facts for sample in samples())
+    return lambda sample, completion, metadata: compute_fact_coverage(sample.required_facts, completion, matcher)
+
+
+@register_metric("refusal_rate")
+def _build_refusal_rate(samples: Callable[[], Iterable[DialogueSample]]) -> Scorer:
+    return lambda sample, completion, metadata: 1.0 if compute_refusal_flag(completion, metadata) else 0.0
+
+
+class MetricSuite:
+    """
+    Scorers for the requested metrics, evaluated together in one pass per
+    completion. Thread CPU time spent in each metric, including its setup,
+    is tallied in `cpu_seconds`.
+    """
+
+    def __init__(self, names: Sequence[str], samples: Callable[[], Iterable[DialogueSample]]) -> None:
+        self.names = list(names) or list(DEFAULT_METRICS)
+        unknown = [name for name in self.names if name not in METRIC_REGISTRY]
+        if unknown:
+            raise ValueError(f"Unknown metrics {', '.join(unknown)}; available: {', '.join(sorted(METRIC_REGISTRY))}")
+
+        self.cpu_seconds = {name: 0.0 for name in self.names}
+        self._scorers: Dict[str, Scorer] = {}
+        for name in self.names:
+            start = time.thread_time()
+            self._scorers[name] = METRIC_REGISTRY[name](samples)
+            self.cpu_seconds[name] += time.thread_time() - start
+
+    def score(self, sample: DialogueSample, completion: str, metadata: Dict[str, Any]) -> Dict[str, float]:
+        scores = {}
+        for name, scorer in self._scorers.items():
+            start = time.thread_time()
+            scores[name] = scorer(sample, completion, metadata)
+            self.cpu_seconds[name] += time.thread_time() - start
+        return scores
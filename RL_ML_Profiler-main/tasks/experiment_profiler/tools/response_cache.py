@@ -0,0 +1,257 @@
+"""Persistent, content-addressed cache of model responses."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from .anthropic_client import AnthropicResponse
+from .dataset import DialogueSample
+
+
+def cache_key(model: str, temperature: float, max_tokens: int, system: str, user: str, backend: str) -> str:
+    """Hash everything that determines a completion into a stable key.
+
+    `backend` keeps simulator output from ever being served to a live run.
+    """
+
+    payload = json.dumps([backend, model, temperature, max_tokens, system, user], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response store with size- and age-based LRU eviction.
+
+    Entries older than `max_age` seconds are treated as misses. When the
+    cache holds more than `max_entries` rows or `max_bytes` of payload, the
+    least recently read entries are evicted until it is back under
+    `EVICT_TO` of each cap. Writes are buffered and committed together every
+    `commit_every` puts or reads, and on `flush` or `close`. Safe to share
+    between threads, and between processes sharing the file.
+    """
+
+    # Evicting below the cap leaves room for many puts before the next eviction
+    EVICT_TO = 0.9
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_age: Optional[float] = None,
+        commit_every: int = 256,
+    ) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        # Not yet committed: key -> (payload, size, created, accessed), and key -> accessed
+        self._pending: Dict[str, Tuple[str, int, float, float]] = {}
+        self._touched: Dict[str, float] = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=60.0, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+            # Running totals, kept exact by triggers so no put has to scan the table
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL, bytes INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO totals (id, entries, bytes) SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            )
+            self._conn.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses BEGIN
+                    UPDATE totals SET entries = entries + 1, bytes = bytes + NEW.size;
+                END
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses BEGIN
+                    UPDATE totals SET entries = entries - 1, bytes = bytes - OLD.size;
+                END
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS responses_resize AFTER UPDATE OF size ON responses BEGIN
+                    UPDATE totals SET bytes = bytes - OLD.size + NEW.size;
+                END
+                """
+            )
+
+    def get(self, key: str) -> Optional[AnthropicResponse]:
+        now = time.time()
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                row: Optional[Tuple[str, float]] = (pending[0], pending[2])
+            else:
+                row = self._conn.execute("SELECT payload, created FROM responses WHERE key = ?", (key,)).fetchone()
+            # Expired rows are deleted by the next flush
+            if row is None or (self.max_age is not None and now - row[1] > self.max_age):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            if pending is not None:
+                self._pending[key] = (*pending[:3], now)
+            else:
+                self._touched[key] = now
+                self._flush_if_due()
+
+        payload = json.loads(row[0])
+        return AnthropicResponse(completion=payload["completion"], metadata=payload["metadata"])
+
+    def put(self, key: str, response: AnthropicResponse) -> None:
+        payload = json.dumps({"completion": response.completion, "metadata": response.metadata}, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._pending[key] = (payload, len(payload.encode("utf-8")), now, now)
+            self._touched.pop(key, None)
+            self._flush_if_due()
+
+    def flush(self) -> None:
+        """Commit buffered writes and evict anything over the limits."""
+
+        with self._lock:
+            self._flush()
+
+    def _flush_if_due(self) -> None:
+        if len(self._pending) + len(self._touched) >= self.commit_every:
+            self._flush()
+
+    def _flush(self) -> None:
+        now = time.time()
+        with self._conn:
+            # Take the write lock up front so totals and eviction see every process's rows
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                """
+                INSERT INTO responses (key, payload, size, created, accessed) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    payload = excluded.payload, size = excluded.size, created = excluded.created, accessed = excluded.accessed
+                """,
+                [(key, *row) for key, row in self._pending.items()],
+            )
+            self._conn.executemany(
+                "UPDATE responses SET accessed = MAX(accessed, ?) WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._evict(now)
+        self._pending.clear()
+        self._touched.clear()
+
+    def _evict(self, now: float) -> None:
+        if self.max_age is not None:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+        entries, size = self._conn.execute("SELECT entries, bytes FROM totals").fetchone()
+        over_entries = self.max_entries is not None and entries > self.max_entries
+        over_bytes = self.max_bytes is not None and size > self.max_bytes
+        if not (over_entries or over_bytes):
+            return
+
+        # Drop the least recently read rows until each exceeded total is under EVICT_TO of its cap
+        excess_entries = entries - int(self.max_entries * self.EVICT_TO) if over_entries else 0
+        excess_bytes = size - int(self.max_bytes * self.EVICT_TO) if over_bytes else 0
+        evicted = []
+        oldest = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed, key")
+        for key, row_size in oldest:
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            evicted.append((key,))
+            excess_entries -= 1
+            excess_bytes -= row_size
+        oldest.close()
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {"cache_hits": self.hits, "cache_misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._conn.close()
+
+
+class CachingClient:
+    """Wraps a client so that only uncached dialogues reach the model.
+
+    Works with both `AnthropicClient.complete` and the chunked
+    `BatchAnthropicClient.complete_many`; in the batch case only the misses
+    of each chunk are submitted.
+    """
+
+    def __init__(self, client: Any, cache: ResponseCache) -> None:
+        self.client = client
+        self.cache = cache
+
+    def _key(self, sample: DialogueSample) -> str:
+        client = self.client
+        return cache_key(client.model, client.temperature, client.max_tokens, sample.system, sample.user, client.backend)
+
+    def complete(self, sample: DialogueSample) -> AnthropicResponse:
+        return self.lookup(sample)[0]
+
+    def lookup(self, sample: DialogueSample) -> Tuple[AnthropicResponse, bool]:
+        """Return the response and whether it was served from the cache."""
+
+        key = self._key(sample)
+        response = self.cache.get(key)
+        if response is not None:
+            return response, True
+        response = self.client.complete(sample)
+        self.cache.put(key, response)
+        return response, False
+
+    def complete_many(self, samples: Iterable[DialogueSample]) -> Iterator[Tuple[DialogueSample, AnthropicResponse]]:
+        for sample, response, _ in self.lookup_many(samples):
+            yield sample, response
+
+    def lookup_many(self, samples: Iterable[DialogueSample]) -> Iterator[Tuple[DialogueSample, AnthropicResponse, bool]]:
+        """Batch counterpart of `lookup`, yielding `(sample, response, cached)` in input order."""
+
+        iterator = iter(samples)
+        while True:
+            chunk = list(islice(iterator, self.client.chunk_size))
+            if not chunk:
+                return
+
+            lookups = [(sample, self._key(sample)) for sample in chunk]
+            cached = {key: self.cache.get(key) for _, key in lookups}
+            misses = [sample for sample, key in lookups if cached[key] is None]
+            fresh = {sample.dialogue_id: response for sample, response in self.client.complete_many(misses)}
+
+            for sample, key in lookups:
+                response = cached[key]
+                if response is None:
+                    response = fresh[sample.dialogue_id]
+                    self.cache.put(key, response)
+                    yield sample, response, False
+                else:
+                    yield sample, response, True
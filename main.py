@@ -1,15 +1,234 @@
 import asyncio
+import base64
+import functools
+import hashlib
+import inspect
 import json
-from collections.abc import Callable
-from contextlib import redirect_stdout
+import multiprocessing
+import os
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager, redirect_stdout
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
 from io import StringIO
+from pathlib import Path
 from typing import Any, TypedDict
 
-from anthropic import AsyncAnthropic
-from anthropic.types import MessageParam, ToolUnionParam
+import httpx
+from anthropic import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncAnthropic,
+    DefaultAsyncHttpxClient,
+)
+from anthropic.types import (
+    Message,
+    MessageParam,
+    ToolUnionParam,
+    ToolUseBlock,
+    Usage,
+)
 
 MAX_TOKENS = 1000
 
+# Connection pool shared by every agent run in the process. Keep-alive
+# connections are reused across runs instead of re-handshaking per run.
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+# Upper bound on how many agent runs main() keeps in flight at once.
+MAX_CONCURRENT_RUNS = 10
+
+# python_expression calls run in a pool of warm worker processes so a slow or
+# runaway expression cannot stall the event loop or crash the harness.
+SANDBOX_WORKERS = 4
+SANDBOX_TIMEOUT = 10.0
+SANDBOX_MEMORY_LIMIT = 512 * 1024 * 1024
+# Imported once by the fork server so every worker starts with them loaded.
+SANDBOX_PRELOAD = [
+    "collections",
+    "decimal",
+    "fractions",
+    "itertools",
+    "json",
+    "math",
+    "random",
+    "re",
+    "statistics",
+]
+
+NUM_RUNS = 10
+
+# Early stopping: stop once the pass-rate confidence interval is this narrow.
+# The cap is the run count; 0.2 at 95% takes at least 16 runs (all passing)
+# and at most 93 (a 50% pass rate), so 100 lets any pass rate settle
+EARLY_STOP_CI_WIDTH = 0.2
+EARLY_STOP_CONFIDENCE = 0.95
+EARLY_STOP_MAX_RUNS = 100
+
+# Marks the end of a prefix the API should cache between requests
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Starting budgets for the rate limiter. They are replaced by the limits the
+# API reports in its anthropic-ratelimit-* response headers.
+REQUESTS_PER_MINUTE = 50
+INPUT_TOKENS_PER_MINUTE = 50_000
+OUTPUT_TOKENS_PER_MINUTE = 10_000
+MAX_API_RETRIES = 8
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+_client: AsyncAnthropic | None = None
+_trace_context: ContextVar["tuple[Tracer, int] | None"] = ContextVar(
+    "trace_context", default=None
+)
+_rate_limiter: "RateLimiter | None" = None
+_sandbox_pool: "SandboxPool | None" = None
+
+
+@dataclass
+class RunStats:
+    """Token usage and latencies accumulated over all API calls of one run."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    # Seconds from sending a streamed request to its first delta / tool_use
+    time_to_first_token: list[float] = field(default_factory=list)
+    time_to_first_tool: list[float] = field(default_factory=list)
+
+    def add(self, usage: Usage) -> None:
+        self.input_tokens += usage.input_tokens
+        self.output_tokens += usage.output_tokens
+        self.cache_read_input_tokens += usage.cache_read_input_tokens or 0
+        self.cache_creation_input_tokens += usage.cache_creation_input_tokens or 0
+
+
+@dataclass
+class Span:
+    """A timed section of an agent run. Times are seconds since tracing began."""
+
+    name: str
+    category: str
+    run_id: int
+    start: float
+    duration: float
+    args: dict[str, Any]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Tracer:
+    """
+    Collects spans for runs, steps, API calls, tool executions and time spent
+    queueing, and exports them as JSONL or as a Chrome/Perfetto trace in
+    which each run is its own track.
+    """
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(
+        self, name: str, category: str, run_id: int = 0, **args: Any
+    ) -> Iterator[dict[str, Any]]:
+        """Times the enclosed block. The yielded dict can be filled with args."""
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            self.spans.append(
+                Span(name, category, run_id, start - self._origin, end - start, args)
+            )
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Count and p50/p95/p99 duration in seconds, per span name."""
+        durations: dict[str, list[float]] = defaultdict(list)
+        for span in self.spans:
+            durations[span.name].append(span.duration)
+        return {
+            name: {
+                "count": len(values),
+                "p50": _percentile(values, 0.50),
+                "p95": _percentile(values, 0.95),
+                "p99": _percentile(values, 0.99),
+            }
+            for name, values in sorted(durations.items())
+        }
+
+    def write_jsonl(self, path: str | Path) -> None:
+        with open(path, "w", encoding="utf-8") as handle:
+            for span in self.spans:
+                handle.write(json.dumps(asdict(span), default=str) + "\n")
+
+    def write_chrome_trace(self, path: str | Path) -> None:
+        events: list[dict[str, Any]] = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": run_id,
+                "args": {"name": f"run {run_id}"},
+            }
+            for run_id in sorted({span.run_id for span in self.spans})
+        ]
+        events.extend(
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": 1,
+                "tid": span.run_id,
+                "args": span.args,
+            }
+            for span in self.spans
+        )
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms"}, handle, default=str
+            )
+
+
+@contextmanager
+def _tracing(tracer: Tracer | None, run_id: int) -> Iterator[None]:
+    token = _trace_context.set((tracer, run_id) if tracer is not None else None)
+    try:
+        yield
+    finally:
+        _trace_context.reset(token)
+
+
+@contextmanager
+def trace_span(name: str, category: str, **args: Any) -> Iterator[dict[str, Any]]:
+    """
+    Records a span on the tracer of the current agent run, if it has one.
+    """
+    context = _trace_context.get()
+    if context is None:
+        yield args
+        return
+    tracer, run_id = context
+    with tracer.span(name, category, run_id, **args) as span_args:
+        yield span_args
+
 
 class PythonExpressionToolResult(TypedDict):
     result: Any
@@ -25,6 +244,10 @@ def python_expression_tool(expression: str) -> PythonExpressionToolResult:
     """
     Tool that evaluates Python expressions using exec.
     Use print(...) to emit output; stdout will be captured and returned.
+
+    Capturing swaps sys.stdout for the whole process, so concurrent calls must
+    not share one; the harness runs it in sandbox worker processes instead
+    (see sandboxed_python_expression_tool).
     """
     try:
         namespace = {}
@@ -35,7 +258,199 @@ def python_expression_tool(expression: str) -> PythonExpressionToolResult:
     except KeyboardInterrupt:
         raise
     except Exception as e:
-        return {"result": None, "error": str(e)}
+        return {"result": None, "error": str(e) or type(e).__name__}
+
+
+def _limit_memory(limit: int) -> None:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - not available on Windows
+        return
+    # RLIMIT_AS caps the address space, which bounds RSS from above
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _sandbox_worker(conn: Any, memory_limit: int) -> None:
+    """
+    Worker process loop: evaluate expressions received over the pipe until it
+    is closed or a None sentinel arrives.
+    """
+    _limit_memory(memory_limit)
+    while True:
+        try:
+            expression = conn.recv()
+        except EOFError:
+            return
+        if expression is None:
+            return
+        conn.send(python_expression_tool(expression))
+
+
+class _SandboxWorker:
+    def __init__(self, context: Any, memory_limit: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_sandbox_worker, args=(child_conn, memory_limit), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        # The pool and a pending replacement may both close the same worker
+        self._close_lock = threading.Lock()
+
+    async def evaluate(
+        self, expression: str, timeout: float
+    ) -> PythonExpressionToolResult:
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = self.conn.fileno()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            self.conn.send(expression)
+            await asyncio.wait_for(ready, timeout)
+        finally:
+            loop.remove_reader(fd)
+        return self.conn.recv()
+
+    def close(self) -> None:
+        with self._close_lock:
+            self.conn.close()
+            self.process.kill()
+            self.process.join()
+
+
+class SandboxPool:
+    """
+    Pool of pre-forked worker processes that evaluate python_expression calls.
+
+    Workers are forked from a fork server that has already imported
+    SANDBOX_PRELOAD, so they skip interpreter startup. Each call gets a
+    wall-clock timeout; each worker gets an address-space cap. A worker that
+    times out or dies is killed and replaced in the background.
+    """
+
+    def __init__(
+        self,
+        size: int = SANDBOX_WORKERS,
+        timeout: float = SANDBOX_TIMEOUT,
+        memory_limit: int = SANDBOX_MEMORY_LIMIT,
+        preload: list[str] = SANDBOX_PRELOAD,
+    ):
+        self.size = size
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._context = multiprocessing.get_context("forkserver")
+            self._context.set_forkserver_preload(["__main__", *preload])
+        else:  # pragma: no cover - Windows
+            self._context = multiprocessing.get_context("spawn")
+        self._idle: asyncio.Queue[_SandboxWorker] | None = None
+        # Workers are spawned from threads, so the set is guarded by a lock
+        self._workers: set[_SandboxWorker] = set()
+        self._lock = threading.Lock()
+        self._replacements: set[asyncio.Task[None]] = set()
+        self._closed = False
+
+    def _spawn(self) -> _SandboxWorker | None:
+        worker = _SandboxWorker(self._context, self.memory_limit)
+        with self._lock:
+            if not self._closed:
+                self._workers.add(worker)
+                return worker
+        # The pool was closed while this worker was starting
+        worker.close()
+        return None
+
+    async def _replace(self, worker: _SandboxWorker) -> None:
+        # Still tracked until closed, so close() kills it if this is cancelled
+        await asyncio.to_thread(worker.close)
+        with self._lock:
+            self._workers.discard(worker)
+        if self._closed:
+            return
+        replacement = await asyncio.to_thread(self._spawn)
+        if replacement is not None and self._idle is not None:
+            self._idle.put_nowait(replacement)
+
+    def _replace_later(self, worker: _SandboxWorker) -> None:
+        # Keep a reference so the task is not collected and close() can cancel it
+        task = asyncio.create_task(self._replace(worker))
+        self._replacements.add(task)
+        task.add_done_callback(self._replacements.discard)
+
+    async def start(self) -> None:
+        if self._closed:
+            raise RuntimeError("Sandbox pool is closed")
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        workers = await asyncio.gather(
+            *(asyncio.to_thread(self._spawn) for _ in range(self.size))
+        )
+        for worker in workers:
+            if worker is not None:
+                self._idle.put_nowait(worker)
+
+    async def run(self, expression: str) -> PythonExpressionToolResult:
+        await self.start()
+        assert self._idle is not None
+        worker = await self._idle.get()
+        try:
+            result = await worker.evaluate(expression, self.timeout)
+        except TimeoutError:
+            self._replace_later(worker)
+            return {
+                "result": None,
+                "error": f"Expression timed out after {self.timeout} seconds",
+            }
+        except (EOFError, OSError):
+            self._replace_later(worker)
+            return {"result": None, "error": "Sandbox worker exited unexpectedly"}
+        except BaseException:
+            # Cancelled mid-call: the worker may still be busy, so replace it
+            self._replace_later(worker)
+            raise
+        if self._idle is not None:
+            self._idle.put_nowait(worker)
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+        # A replacement already spawning sees _closed and kills its own worker
+        for task in list(self._replacements):
+            task.cancel()
+        for worker in workers:
+            worker.close()
+        self._idle = None
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """
+    Returns the process-wide sandbox pool, creating it on first use.
+    """
+    global _sandbox_pool
+    if _sandbox_pool is None:
+        _sandbox_pool = SandboxPool()
+    return _sandbox_pool
+
+
+def shutdown_sandbox_pool() -> None:
+    global _sandbox_pool
+    if _sandbox_pool is not None:
+        _sandbox_pool.close()
+        _sandbox_pool = None
+
+
+async def sandboxed_python_expression_tool(
+    expression: str,
+) -> PythonExpressionToolResult:
+    """
+    Async variant of python_expression_tool that evaluates the expression in
+    the sandbox pool instead of on the event-loop thread.
+    """
+    return await get_sandbox_pool().run(expression)
 
 
 def submit_answer_tool(answer: Any) -> SubmitAnswerToolResult:
@@ -45,6 +460,558 @@ def submit_answer_tool(answer: Any) -> SubmitAnswerToolResult:
     return {"answer": answer, "submitted": True}
 
 
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    HTTP transport that records API exchanges to, or replays them from, a
+    content-addressed cassette directory.
+
+    Each request is keyed by the SHA-256 of its method, path and canonical
+    JSON body, and stored as <key>.json with the response status, headers,
+    body and the latency observed while recording. In "record" mode requests
+    are forwarded to `transport` and saved; in "replay" mode they are served
+    from disk, optionally after sleeping for the recorded latency. A replayed
+    request with no recording gets a 404 response.
+    """
+
+    # Dropped on record because the stored body is already decoded
+    _SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+    def __init__(
+        self,
+        directory: str | Path,
+        mode: str = "replay",
+        emulate_latency: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"unsupported cassette mode {mode!r}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.emulate_latency = emulate_latency
+        self._transport = transport or httpx.AsyncHTTPTransport()
+        if mode == "record":
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def request_key(request: httpx.Request) -> str:
+        body = request.content
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True).encode()
+        except ValueError:
+            pass
+        digest = hashlib.sha256()
+        digest.update(f"{request.method} {request.url.path}\n".encode())
+        digest.update(body)
+        return digest.hexdigest()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        path = self.directory / f"{self.request_key(request)}.json"
+
+        if self.mode == "replay":
+            if not path.exists():
+                return httpx.Response(
+                    404,
+                    json={
+                        "type": "error",
+                        "error": {
+                            "type": "not_found_error",
+                            "message": f"No cassette recording {path.name}",
+                        },
+                    },
+                    request=request,
+                )
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            if self.emulate_latency:
+                await asyncio.sleep(entry["elapsed"])
+            return httpx.Response(
+                entry["status_code"],
+                headers=entry["headers"],
+                content=base64.b64decode(entry["body"]),
+                request=request,
+            )
+
+        started = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        body = await response.aread()
+        headers = [
+            (name, value)
+            for name, value in response.headers.multi_items()
+            if name.lower() not in self._SKIPPED_HEADERS
+        ]
+        entry = {
+            "status_code": response.status_code,
+            "headers": headers,
+            "body": base64.b64encode(body).decode("ascii"),
+            "elapsed": time.perf_counter() - started,
+        }
+        # Write atomically so concurrent runs recording the same key never
+        # leave a partial file behind
+        temporary = path.with_suffix(f".{os.getpid()}.{id(entry)}.tmp")
+        temporary.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(temporary, path)
+        return httpx.Response(
+            response.status_code, headers=headers, content=body, request=request
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def make_client(
+    max_connections: int = MAX_CONNECTIONS,
+    max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+    cassette_dir: str | Path | None = None,
+    cassette_mode: str = "replay",
+    emulate_latency: bool = False,
+) -> AsyncAnthropic:
+    """
+    Creates an AsyncAnthropic client backed by a bounded HTTP connection pool.
+
+    With cassette_dir, requests go through a CassetteTransport that records
+    to or replays from that directory (see CassetteTransport).
+    """
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+    )
+    if cassette_dir is None:
+        return AsyncAnthropic(http_client=DefaultAsyncHttpxClient(limits=limits))
+
+    transport = CassetteTransport(
+        cassette_dir,
+        mode=cassette_mode,
+        emulate_latency=emulate_latency,
+        transport=httpx.AsyncHTTPTransport(limits=limits),
+    )
+    # Replay never reaches the API, so it must work without a real key
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if api_key is None and cassette_mode == "replay":
+        api_key = "cassette-replay"
+    return AsyncAnthropic(
+        api_key=api_key, http_client=DefaultAsyncHttpxClient(transport=transport)
+    )
+
+
+def get_client() -> AsyncAnthropic:
+    """
+    Returns the process-wide client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        _client = make_client()
+    return _client
+
+
+def estimate_tokens(value: Any) -> int:
+    """
+    Rough token count of a request payload (about 4 characters per token).
+    """
+
+    def default(obj: Any) -> Any:
+        return obj.model_dump() if hasattr(obj, "model_dump") else str(obj)
+
+    return len(json.dumps(value, default=default)) // 4 + 1
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        rate = self.capacity / 60
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing, 0.0) / (self.capacity / 60)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def give(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def set_limit(self, limit: float, remaining: float) -> None:
+        self._refill()
+        self.capacity = float(limit)
+        self.tokens = min(self.tokens, float(remaining))
+
+
+class RateLimiter:
+    """
+    Token-bucket scheduler for the requests, input-token and output-token
+    per-minute budgets.
+
+    Each call reserves one request, its estimated input tokens and its
+    max_tokens of output before it is sent, waiting until all three buckets
+    can cover it. Buckets are resynchronised from the rate-limit headers of
+    every response, and a throttled call pauses every caller sharing the
+    limiter until the API's retry-after has elapsed.
+    """
+
+    _HEADERS = {
+        "requests": "requests",
+        "input_tokens": "input-tokens",
+        "output_tokens": "output-tokens",
+    }
+
+    def __init__(
+        self,
+        requests_per_minute: float = REQUESTS_PER_MINUTE,
+        input_tokens_per_minute: float = INPUT_TOKENS_PER_MINUTE,
+        output_tokens_per_minute: float = OUTPUT_TOKENS_PER_MINUTE,
+    ):
+        self._buckets = {
+            "requests": _TokenBucket(requests_per_minute),
+            "input_tokens": _TokenBucket(input_tokens_per_minute),
+            "output_tokens": _TokenBucket(output_tokens_per_minute),
+        }
+        self._resume_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, input_tokens: int, output_tokens: int) -> None:
+        cost = {
+            "requests": 1,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        }
+        # Callers queue on the lock so the budget is handed out in FIFO order
+        async with self._lock:
+            while True:
+                delay = max(
+                    self._resume_at - time.monotonic(),
+                    *(bucket.delay(cost[name]) for name, bucket in self._buckets.items()),
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            for name, bucket in self._buckets.items():
+                bucket.take(cost[name])
+
+    def refund(self, input_tokens: int, output_tokens: int) -> None:
+        """Settle a reservation against actual usage (negative to charge more)."""
+        self._buckets["input_tokens"].give(input_tokens)
+        self._buckets["output_tokens"].give(output_tokens)
+
+    def update(self, headers: httpx.Headers) -> None:
+        for name, header in self._HEADERS.items():
+            limit = headers.get(f"anthropic-ratelimit-{header}-limit")
+            remaining = headers.get(f"anthropic-ratelimit-{header}-remaining")
+            if limit is not None and remaining is not None:
+                self._buckets[name].set_limit(float(limit), float(remaining))
+
+    def pause(self, seconds: float) -> None:
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Returns the process-wide rate limiter, creating it on first use.
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, APIStatusError):
+        # 429 rate limited, 529 overloaded, other 5xx transient server errors
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, APIConnectionError)
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    backoff = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt)
+    retry_after = 0.0
+    if isinstance(error, APIStatusError):
+        try:
+            retry_after = float(error.response.headers.get("retry-after", 0))
+        except ValueError:
+            pass
+    # Full jitter keeps concurrent runs from retrying in lockstep
+    return retry_after + random.uniform(0, backoff)
+
+
+async def _send_with_retries(
+    rate_limiter: RateLimiter,
+    params: dict[str, Any],
+    send: Callable[[], Awaitable[tuple[Message, httpx.Headers]]],
+    can_retry: Callable[[], bool] = lambda: True,
+) -> Message:
+    input_tokens = estimate_tokens(
+        {key: params.get(key) for key in ("system", "tools", "messages")}
+    )
+    output_tokens = params["max_tokens"]
+
+    for attempt in range(MAX_API_RETRIES + 1):
+        with trace_span("rate_limit_wait", "queue"):
+            await rate_limiter.acquire(input_tokens, output_tokens)
+        try:
+            with trace_span("api_call", "api", attempt=attempt) as span_args:
+                response, headers = await send()
+                span_args.update(
+                    input_tokens=response.usage.input_tokens,
+                    output_tokens=response.usage.output_tokens,
+                    stop_reason=response.stop_reason,
+                )
+        except Exception as e:
+            if not _is_retryable(e) or not can_retry() or attempt == MAX_API_RETRIES:
+                raise
+            if isinstance(e, APIStatusError):
+                rate_limiter.update(e.response.headers)
+            rate_limiter.pause(_retry_delay(e, attempt))
+            continue
+
+        rate_limiter.update(headers)
+        rate_limiter.refund(
+            input_tokens - response.usage.input_tokens,
+            output_tokens - response.usage.output_tokens,
+        )
+        return response
+
+    raise AssertionError("unreachable")
+
+
+async def create_message(
+    client: AsyncAnthropic, rate_limiter: RateLimiter, **params: Any
+) -> Message:
+    """
+    Calls client.messages.create within the rate limiter's budget, retrying
+    throttled and transient failures with jittered exponential backoff.
+    """
+    # Retries are handled here so that throttling is visible to the limiter
+    client = client.with_options(max_retries=0)
+
+    async def send() -> tuple[Message, httpx.Headers]:
+        raw = await client.messages.with_raw_response.create(**params)
+        return raw.parse(), raw.headers
+
+    return await _send_with_retries(rate_limiter, params, send)
+
+
+async def stream_message(
+    client: AsyncAnthropic,
+    rate_limiter: RateLimiter,
+    on_tool_use: Callable[[ToolUseBlock], None],
+    stats: RunStats | None = None,
+    **params: Any,
+) -> Message:
+    """
+    Streaming variant of create_message. Calls on_tool_use with each tool_use
+    block as soon as its input JSON is complete, while the rest of the
+    response is still being generated, and records time-to-first-token and
+    time-to-first-tool in stats.
+
+    A failed call is only retried if no tool has been dispatched yet.
+    """
+    client = client.with_options(max_retries=0)
+    dispatched = False
+
+    async def send() -> tuple[Message, httpx.Headers]:
+        nonlocal dispatched
+        started = time.perf_counter()
+        first_token = False
+        async with client.messages.stream(**params) as stream:
+            async for event in stream:
+                if event.type == "content_block_delta" and not first_token:
+                    first_token = True
+                    if stats is not None:
+                        stats.time_to_first_token.append(
+                            time.perf_counter() - started
+                        )
+                elif (
+                    event.type == "content_block_stop"
+                    and event.content_block.type == "tool_use"
+                ):
+                    if not dispatched and stats is not None:
+                        stats.time_to_first_tool.append(time.perf_counter() - started)
+                    dispatched = True
+                    on_tool_use(event.content_block)
+            return await stream.get_final_message(), stream.response.headers
+
+    return await _send_with_retries(
+        rate_limiter, params, send, can_retry=lambda: not dispatched
+    )
+
+
+@dataclass
+class CompactionPolicy:
+    """
+    Bounds the conversation history sent on each step of run_agent_loop.
+
+    The initial prompt and the last keep_last_turns assistant/tool-result
+    turns are sent verbatim. Older tool results are cut to
+    max_tool_result_chars. If the estimated size still exceeds token_budget,
+    the oldest turns are dropped whole, so every tool_use keeps its
+    tool_result, and the prompt notes how many turns were omitted.
+    Compaction changes the history prefix, so it reduces prompt cache hits.
+    """
+
+    keep_last_turns: int = 2
+    max_tool_result_chars: int = 200
+    token_budget: int | None = None
+
+    def _truncate(self, block: Any) -> Any:
+        if not isinstance(block, dict) or block.get("type") != "tool_result":
+            return block
+        content = block.get("content")
+        if not isinstance(content, str) or len(content) <= self.max_tool_result_chars:
+            return block
+        elided = len(content) - self.max_tool_result_chars
+        return {
+            **block,
+            "content": f"{content[: self.max_tool_result_chars]}"
+            f"... [{elided} characters elided]",
+        }
+
+    def apply(self, messages: list[MessageParam]) -> list[MessageParam]:
+        """Returns a compacted copy of messages; the original is not modified."""
+        prompt, history = messages[0], messages[1:]
+        turns = [history[i : i + 2] for i in range(0, len(history), 2)]
+        cutoff = max(len(turns) - self.keep_last_turns, 0)
+        for index in range(cutoff):
+            assistant, *results = turns[index]
+            turns[index] = [assistant] + [
+                {
+                    **message,
+                    "content": [self._truncate(b) for b in message["content"]],
+                }
+                for message in results
+            ]
+
+        dropped = 0
+        if self.token_budget is not None:
+            while dropped < cutoff and (
+                estimate_tokens([prompt, *turns[dropped:]]) > self.token_budget
+            ):
+                dropped += 1
+        if dropped:
+            note = f"[{dropped} earlier turn(s) omitted to save context]"
+            content = prompt["content"]
+            if isinstance(content, str):
+                content = f"{content}\n\n{note}"
+            else:
+                content = [*content, {"type": "text", "text": note}]
+            prompt = {**prompt, "content": content}
+
+        return [prompt, *(message for turn in turns[dropped:] for message in turn)]
+
+
+def with_cache_breakpoints(
+    tools: list[ToolUnionParam], messages: list[MessageParam]
+) -> tuple[list[ToolUnionParam], list[MessageParam]]:
+    """
+    Returns copies of tools and messages with cache_control breakpoints on the
+    last tool definition and on the last content block of the conversation.
+
+    The tool breakpoint caches the tool list shared by every run; the moving
+    conversation breakpoint caches the history so the next step only pays
+    for what was appended since. The originals are left untouched.
+    """
+    if tools:
+        tools = [*tools[:-1], {**tools[-1], "cache_control": CACHE_CONTROL}]
+
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = [
+            block if isinstance(block, dict) else block.model_dump()
+            for block in content
+        ]
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    messages = [*messages[:-1], {"role": last["role"], "content": blocks}]
+    return tools, messages
+
+
+async def call_handler(handler: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Calls a tool handler without blocking the event loop. Coroutine handlers
+    are awaited directly; synchronous handlers run in the default executor,
+    so they must be thread-safe.
+    """
+    if inspect.iscoroutinefunction(handler):
+        return await handler(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(
+        None, functools.partial(handler, *args, **kwargs)
+    )
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def run_tool(
+    content: ToolUseBlock,
+    tool_handlers: dict[str, Callable[..., Any]],
+    verbose: bool = False,
+) -> tuple[dict[str, Any] | None, Any]:
+    """
+    Executes a single tool_use block with its handler.
+
+    Returns:
+        The tool_result block (None if no handler is registered for the tool)
+        and the submitted answer if submit_answer was called, otherwise None
+    """
+    tool_name = content.name
+    if tool_name not in tool_handlers:
+        return None, None
+
+    if verbose:
+        print(f"Using tool: {tool_name}")
+
+    # Extract arguments based on tool
+    handler = tool_handlers[tool_name]
+    tool_input = content.input
+    submitted_answer = None
+
+    # Call the appropriate tool handler
+    with trace_span(f"tool:{tool_name}", "tool", tool_use_id=content.id):
+        if tool_name == "python_expression":
+            assert isinstance(tool_input, dict) and "expression" in tool_input
+            if verbose:
+                print("\nInput:")
+                print("```")
+                for line in tool_input["expression"].split("\n"):
+                    print(f"{line}")
+                print("```")
+            result = await call_handler(handler, tool_input["expression"])
+            if verbose:
+                print("\nOutput:")
+                print("```")
+                print(result)
+                print("```")
+        elif tool_name == "submit_answer":
+            assert isinstance(tool_input, dict) and "answer" in tool_input
+            result = await call_handler(handler, tool_input["answer"])
+            submitted_answer = result["answer"]
+        else:
+            # Generic handler call
+            result = await (
+                call_handler(handler, **tool_input)
+                if isinstance(tool_input, dict)
+                else call_handler(handler, tool_input)
+            )
+
+    tool_result = {
+        "type": "tool_result",
+        "tool_use_id": content.id,
+        "content": json.dumps(result),
+    }
+    return tool_result, submitted_answer
+
+
 async def run_agent_loop(
     prompt: str,
     tools: list[ToolUnionParam],
@@ -52,6 +1019,14 @@ async def run_agent_loop(
     max_steps: int = 20,
     model: str = "claude-haiku-4-5",
     verbose: bool = True,
+    client: AsyncAnthropic | None = None,
+    rate_limiter: RateLimiter | None = None,
+    cache_prompt: bool = False,
+    stream: bool = False,
+    stats: RunStats | None = None,
+    tracer: Tracer | None = None,
+    run_id: int = 0,
+    compaction: CompactionPolicy | None = None,
 ) -> Any | None:
     """
     Runs an agent loop with the given prompt and tools.
@@ -63,110 +1038,158 @@ async def run_agent_loop(
         max_steps: Maximum number of steps before stopping (default 5)
         model: The Anthropic model to use
         verbose: Whether to print detailed output (default True)
+        client: Client to send requests with (default: the shared client)
+        rate_limiter: Budget shared with other runs (default: the shared limiter)
+        cache_prompt: Whether to mark the tools and conversation for prompt caching
+        stream: Whether to stream responses and start each tool call as soon
+            as its tool_use block is complete
+        stats: Accumulates token usage and streaming latencies, if given
+        tracer: Records spans for the run, its steps, API calls and tools
+        run_id: Track the spans are recorded on (default 0)
+        compaction: Bounds the history sent with each request (default: send
+            the full history)
 
     Returns:
         The submitted answer if submit_answer was called, otherwise None
     """
-    client = AsyncAnthropic()
-    messages: list[MessageParam] = [{"role": "user", "content": prompt}]
+    if client is None:
+        client = get_client()
+    if rate_limiter is None:
+        rate_limiter = get_rate_limiter()
+    with _tracing(tracer, run_id), trace_span("run", "run"):
+        messages: list[MessageParam] = [{"role": "user", "content": prompt}]
 
-    for step in range(max_steps):
-        if verbose:
-            print(f"\n=== Step {step + 1}/{max_steps} ===")
+        for step in range(max_steps):
+            with trace_span("step", "step", step=step + 1):
+                if verbose:
+                    print(f"\n=== Step {step + 1}/{max_steps} ===")
 
-        response = await client.messages.create(
-            model=model, max_tokens=MAX_TOKENS, tools=tools, messages=messages
-        )
+                request_messages = (
+                    compaction.apply(messages) if compaction else messages
+                )
+                request_tools, request_messages = (
+                    with_cache_breakpoints(tools, request_messages)
+                    if cache_prompt
+                    else (tools, request_messages)
+                )
+                params = {
+                    "model": model,
+                    "max_tokens": MAX_TOKENS,
+                    "tools": request_tools,
+                    "messages": request_messages,
+                }
 
-        assert response.stop_reason in ["max_tokens", "tool_use", "end_turn"], (
-            f"unsupported stop_reason {response.stop_reason}"
-        )
-        if response.stop_reason == "max_tokens":
-            print(
-                f"Model reached max_tokens limit {MAX_TOKENS}. Increase "
-                "MAX_TOKENS, simplify your task, or update the code to provide "
-                "a message back to the model when it exceeds MAX_TOKENS."
-            )
+                # Tool calls started while the response is still streaming
+                tool_tasks: dict[str, asyncio.Task] = {}
 
-        # Track if we need to continue
-        has_tool_use = False
-        tool_results = []
-        submitted_answer = None
+                def dispatch(content: ToolUseBlock) -> None:
+                    tool_tasks[content.id] = asyncio.create_task(
+                        run_tool(content, tool_handlers, verbose)
+                    )
+
+                try:
+                    if stream:
+                        response = await stream_message(
+                            client, rate_limiter, dispatch, stats, **params
+                        )
+                    else:
+                        response = await create_message(client, rate_limiter, **params)
+                except BaseException:
+                    for task in tool_tasks.values():
+                        task.cancel()
+                    raise
+                if stats is not None:
+                    stats.add(response.usage)
 
-        # Process the response
-        for content in response.content:
-            if content.type == "text":
+                assert response.stop_reason in ["max_tokens", "tool_use", "end_turn"], (
+                    f"unsupported stop_reason {response.stop_reason}"
+                )
+                if response.stop_reason == "max_tokens":
+                    print(
+                        f"Model reached max_tokens limit {MAX_TOKENS}. Increase "
+                        "MAX_TOKENS, simplify your task, or update the code to provide "
+                        "a message back to the model when it exceeds MAX_TOKENS."
+                    )
+
+                # Process the response
                 if verbose:
-                    print(f"Assistant: {content.text}")
-            elif content.type == "tool_use":
-                has_tool_use = True
-                tool_name = content.name
+                    for content in response.content:
+                        if content.type == "text":
+                            print(f"Assistant: {content.text}")
 
-                if tool_name in tool_handlers:
-                    if verbose:
-                        print(f"Using tool: {tool_name}")
+                # Run the tool calls concurrently (streamed ones are already
+                # running) and collect their results in tool_use order
+                tool_uses = [c for c in response.content if c.type == "tool_use"]
+                for content in tool_uses:
+                    if content.id not in tool_tasks:
+                        dispatch(content)
+                try:
+                    outcomes = await asyncio.gather(
+                        *(tool_tasks[content.id] for content in tool_uses)
+                    )
+                except BaseException:
+                    for task in tool_tasks.values():
+                        task.cancel()
+                    raise
 
-                    # Extract arguments based on tool
-                    handler = tool_handlers[tool_name]
-                    tool_input = content.input
+                # Track if we need to continue
+                has_tool_use = bool(tool_uses)
+                tool_results = [result for result, _ in outcomes if result is not None]
+                submitted_answer = None
+                for _, answer in outcomes:
+                    if answer is not None:
+                        submitted_answer = answer
 
-                    # Call the appropriate tool handler
-                    if tool_name == "python_expression":
-                        assert (
-                            isinstance(tool_input, dict) and "expression" in tool_input
-                        )
-                        if verbose:
-                            print("\nInput:")
-                            print("```")
-                            for line in tool_input["expression"].split("\n"):
-                                print(f"{line}")
-                            print("```")
-                        result = handler(tool_input["expression"])
+                # If we have tool uses, add them to the conversation
+                if has_tool_use:
+                    messages.append({"role": "assistant", "content": response.content})
+
+                    messages.append({"role": "user", "content": tool_results})
+
+                    # If an answer was submitted, return it
+                    if submitted_answer is not None:
                         if verbose:
-                            print("\nOutput:")
-                            print("```")
-                            print(result)
-                            print("```")
-                    elif tool_name == "submit_answer":
-                        assert isinstance(tool_input, dict) and "answer" in tool_input
-                        result = handler(tool_input["answer"])
-                        submitted_answer = result["answer"]
-                    else:
-                        # Generic handler call
-                        result = (
-                            handler(**tool_input)
-                            if isinstance(tool_input, dict)
-                            else handler(tool_input)
-                        )
+                            print(f"\nAgent submitted answer: {submitted_answer}")
+                        return submitted_answer
+                else:
+                    # No tool use, conversation might be complete
+                    if verbose:
+                        print("\nNo tool use in response, ending loop.")
+                    break
 
-                    tool_results.append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content.id,
-                            "content": json.dumps(result),
-                        }
-                    )
+        if verbose:
+            print(f"\nReached maximum steps ({max_steps}) without submitting answer.")
+        return None
 
-        # If we have tool uses, add them to the conversation
-        if has_tool_use:
-            messages.append({"role": "assistant", "content": response.content})
 
-            messages.append({"role": "user", "content": tool_results})
+def wilson_interval(
+    successes: int, trials: int, confidence: float = EARLY_STOP_CONFIDENCE
+) -> tuple[float, float]:
+    """
+    Wilson score interval for a pass rate of successes/trials.
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / trials
+    denominator = 1 + z**2 / trials
+    center = (p + z**2 / (2 * trials)) / denominator
+    margin = z * (p * (1 - p) / trials + z**2 / (4 * trials**2)) ** 0.5 / denominator
+    return max(center - margin, 0.0), min(center + margin, 1.0)
 
-            # If an answer was submitted, return it
-            if submitted_answer is not None:
-                if verbose:
-                    print(f"\nAgent submitted answer: {submitted_answer}")
-                return submitted_answer
-        else:
-            # No tool use, conversation might be complete
-            if verbose:
-                print("\nNo tool use in response, ending loop.")
-            break
 
-    if verbose:
-        print(f"\nReached maximum steps ({max_steps}) without submitting answer.")
-    return None
+def min_runs_for_ci_width(ci_width: float, confidence: float = EARLY_STOP_CONFIDENCE) -> int:
+    """
+    Fewest runs whose Wilson interval can be ci_width wide (when every run agrees).
+    """
+    if not 0 < ci_width < 1:
+        raise ValueError("ci_width must be between 0 and 1")
+    trials = 1
+    while True:
+        low, high = wilson_interval(trials, trials, confidence)
+        if high - low <= ci_width:
+            return trials
+        trials += 1
 
 
 async def run_single_test(
@@ -177,29 +1200,63 @@ async def run_single_test(
     tool_handlers: dict[str, Callable[..., Any]],
     expected_answer: Any,
     verbose: bool = False,
-) -> tuple[int, bool, Any]:
+    cache_prompt: bool = False,
+    stream: bool = False,
+    tracer: Tracer | None = None,
+    client: AsyncAnthropic | None = None,
+    compaction: CompactionPolicy | None = None,
+) -> tuple[int, bool, Any, RunStats]:
     if verbose:
         print(f"\n\n{'=' * 20} RUN {run_id}/{num_runs} {'=' * 20}")
 
+    stats = RunStats()
     result = await run_agent_loop(
         prompt=prompt,
         tools=tools,
         tool_handlers=tool_handlers,
         max_steps=5,
         verbose=verbose,
+        cache_prompt=cache_prompt,
+        stream=stream,
+        stats=stats,
+        tracer=tracer,
+        run_id=run_id,
+        client=client,
+        compaction=compaction,
     )
 
     success = result == expected_answer
+    cache_info = (
+        f"(cache read {stats.cache_read_input_tokens}, "
+        f"cache write {stats.cache_creation_input_tokens} tokens)"
+    )
 
     if success:
-        print(f"✓ Run {run_id}: SUCCESS - Got {result}")
+        print(f"✓ Run {run_id}: SUCCESS - Got {result} {cache_info}")
     else:
-        print(f"✗ Run {run_id}: FAILURE - Got {result}, expected {expected_answer}")
+        print(
+            f"✗ Run {run_id}: FAILURE - Got {result}, expected {expected_answer} "
+            f"{cache_info}"
+        )
 
-    return run_id, success, result
+    return run_id, success, result, stats
 
 
-async def main(concurrent: bool = True):
+async def main(
+    concurrent: bool = True,
+    max_concurrency: int = MAX_CONCURRENT_RUNS,
+    cache_prompt: bool = False,
+    stream: bool = False,
+    trace_dir: str | Path | None = None,
+    early_stop: bool = False,
+    ci_width: float = EARLY_STOP_CI_WIDTH,
+    confidence: float = EARLY_STOP_CONFIDENCE,
+    num_runs: int | None = None,
+    cassette_dir: str | Path | None = None,
+    cassette_mode: str = "replay",
+    emulate_latency: bool = False,
+    compaction: CompactionPolicy | None = None,
+):
     tools: list[ToolUnionParam] = [
         {
             "name": "python_expression",
@@ -227,19 +1284,48 @@ async def main(concurrent: bool = True):
     ]
 
     tool_handlers = {
-        "python_expression": python_expression_tool,
+        "python_expression": sandboxed_python_expression_tool,
         "submit_answer": submit_answer_tool,
     }
 
-    # Run the test 10 times and track success rate
-    num_runs = 10
+    # Run the test num_runs times and track success rate. With early_stop, this
+    # is the maximum and runs stop once the pass rate is known to within ci_width
+    if num_runs is None:
+        num_runs = EARLY_STOP_MAX_RUNS if early_stop else NUM_RUNS
+    if early_stop:
+        needed = min_runs_for_ci_width(ci_width, confidence)
+        if needed > num_runs:
+            raise ValueError(
+                f"ci_width={ci_width} needs at least {needed} runs at {confidence:.0%} confidence, "
+                f"so early stopping could never trigger within num_runs={num_runs}"
+            )
     expected_answer = 8769
     prompt = "Calculate (2^10 + 3^5) * 7 - 100. Use the python_expression tool and then submit the answer."
 
     execution_mode = "concurrently" if concurrent else "sequentially"
-    print(f"Running {num_runs} test iterations {execution_mode}...")
+    limit = "up to " if early_stop else ""
+    print(f"Running {limit}{num_runs} test iterations {execution_mode}...")
     print("=" * 60)
 
+    tracer = Tracer()
+    # Record or replay API traffic instead of using the shared client
+    client = (
+        make_client(
+            cassette_dir=cassette_dir,
+            cassette_mode=cassette_mode,
+            emulate_latency=emulate_latency,
+        )
+        if cassette_dir is not None
+        else None
+    )
+
+    def settled(results) -> bool:
+        if not early_stop:
+            return False
+        successes = sum(success for _, success, _, _ in results)
+        low, high = wilson_interval(successes, len(results), confidence)
+        return high - low <= ci_width
+
     # Create all test coroutines
     tasks = [
         run_single_test(
@@ -250,36 +1336,113 @@ async def main(concurrent: bool = True):
             tool_handlers=tool_handlers,
             expected_answer=expected_answer,
             verbose=False,
+            cache_prompt=cache_prompt,
+            stream=stream,
+            tracer=tracer,
+            client=client,
+            compaction=compaction,
         )
         for i in range(num_runs)
     ]
 
     # Run concurrently or sequentially based on the flag
     if concurrent:
+        # Cap the number of runs in flight so large batches share the
+        # connection pool instead of opening a socket per run
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded(run_id, task):
+            try:
+                with tracer.span("run_queue", "queue", run_id):
+                    await semaphore.acquire()
+            except asyncio.CancelledError:
+                # Cancelled before it started (early stop)
+                task.close()
+                raise
+            try:
+                return await task
+            finally:
+                semaphore.release()
+
         # Process results as they complete
         results = []
-        for coro in asyncio.as_completed(tasks):
-            result = await coro
-            results.append(result)
+        pending = {
+            asyncio.create_task(bounded(i + 1, task)) for i, task in enumerate(tasks)
+        }
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            # Every run that finished counts, not just the one that woke us
+            finished = [task.result() for task in done]
+            results.extend(sorted(finished, key=lambda result: result[0]))
+            if settled(results):
+                # Cancel runs still queued or in flight
+                for task in pending:
+                    task.cancel()
+                outcomes = await asyncio.gather(*pending, return_exceptions=True)
+                # A run that finished before its cancellation landed still counts
+                results.extend(
+                    outcome
+                    for outcome in outcomes
+                    if not isinstance(outcome, BaseException)
+                )
+                break
     else:
         # Run sequentially by awaiting each task in order
         results = []
-        for task in tasks:
+        for i, task in enumerate(tasks):
             result = await task
             results.append(result)
+            if settled(results):
+                for remaining in tasks[i + 1 :]:
+                    remaining.close()
+                break
+
+    shutdown_sandbox_pool()
 
     # Count successes
-    successes = sum(success for _, success, _ in results)
+    successes = sum(success for _, success, _, _ in results)
+    cache_read = sum(stats.cache_read_input_tokens for *_, stats in results)
+    cache_write = sum(stats.cache_creation_input_tokens for *_, stats in results)
+    first_token = [t for *_, stats in results for t in stats.time_to_first_token]
+    first_tool = [t for *_, stats in results for t in stats.time_to_first_tool]
 
     # Calculate and display pass rate
-    pass_rate = (successes / num_runs) * 100
+    completed = len(results)
+    pass_rate = (successes / completed) * 100
+    low, high = wilson_interval(successes, completed, confidence)
     print(f"\n{'=' * 60}")
     print("Test Results:")
-    print(f"  Passed: {successes}/{num_runs}")
-    print(f"  Failed: {num_runs - successes}/{num_runs}")
+    if completed < num_runs:
+        print(f"  Stopped early after {completed}/{num_runs} runs")
+    print(f"  Passed: {successes}/{completed}")
+    print(f"  Failed: {completed - successes}/{completed}")
     print(f"  Pass Rate: {pass_rate:.1f}%")
+    print(f"  {confidence:.0%} CI: [{low * 100:.1f}%, {high * 100:.1f}%]")
+    print(f"  Cache Read Tokens: {cache_read}")
+    print(f"  Cache Write Tokens: {cache_write}")
+    if first_token:
+        print(f"  Mean Time to First Token: {sum(first_token) / len(first_token):.3f}s")
+    if first_tool:
+        print(f"  Mean Time to First Tool: {sum(first_tool) / len(first_tool):.3f}s")
     print(f"{'=' * 60}")
 
+    print("Latency (seconds):")
+    print(f"  {'span':<24}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, row in tracer.summary().items():
+        print(
+            f"  {name:<24}{row['count']:>7}"
+            f"{row['p50']:>10.3f}{row['p95']:>10.3f}{row['p99']:>10.3f}"
+        )
+
+    if trace_dir is not None:
+        trace_dir = Path(trace_dir)
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        tracer.write_jsonl(trace_dir / "spans.jsonl")
+        tracer.write_chrome_trace(trace_dir / "trace.json")
+        print(f"Trace written to {trace_dir / 'trace.json'}")
+
 
 if __name__ == "__main__":
     # Set to True for concurrent execution, False for sequential execution
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import re
+
+import httpx
+import pytest
+from anthropic import AsyncAnthropic
+
+import main
+
+
+@pytest.mark.parametrize("delay", [0.0, 0.05, 0.3])
+def test_close_while_replacements_are_pending(monkeypatch, delay):
+    spawned = []
+
+    class RecordingWorker(main._SandboxWorker):
+        def __init__(self, *args):
+            super().__init__(*args)
+            spawned.append(self)
+
+    monkeypatch.setattr(main, "_SandboxWorker", RecordingWorker)
+    pool = main.SandboxPool(size=2, timeout=0.2)
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(pool.run("while True: pass") for _ in range(2))
+        )
+        assert all("timed out" in result["error"] for result in results)
+        assert pool._replacements
+        # Close while the replacements are closing or spawning workers
+        await asyncio.sleep(delay)
+        pool.close()
+
+    # asyncio.run waits for the executor threads the replacements started
+    asyncio.run(scenario())
+    assert pool._workers == set()
+    assert [worker for worker in spawned if worker.process.is_alive()] == []
+    with pytest.raises(RuntimeError, match="closed"):
+        asyncio.run(pool.run("print(1)"))
+
+
+def _tool_use(name, tool_input):
+    return {
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-haiku-4-5",
+        "content": [
+            {"type": "tool_use", "id": "toolu_test", "name": name, "input": tool_input}
+        ],
+        "stop_reason": "tool_use",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    }
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """Answer every run with a python_expression call, then the right answer."""
+
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        messages = json.loads(request.content)["messages"]
+        if len(messages) == 1:
+            body = _tool_use("python_expression", {"expression": "print(1)"})
+        else:
+            body = _tool_use("submit_answer", {"answer": 8769})
+        return httpx.Response(200, json=body)
+
+    client = AsyncAnthropic(
+        api_key="test", http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(main, "_client", client)
+    monkeypatch.setattr(main, "_rate_limiter", main.RateLimiter(1e6, 1e9, 1e9))
+
+
+def test_concurrent_early_stop_keeps_runs_that_already_finished(monkeypatch, capsys):
+    async def run_in_waves(run_id, **kwargs):
+        # Runs admitted together finish in the same event-loop iteration
+        for _ in range(3):
+            await asyncio.sleep(0)
+        print(f"✓ Run {run_id}: SUCCESS")
+        return run_id, True, 8769, main.RunStats()
+
+    monkeypatch.setattr(main, "run_single_test", run_in_waves)
+    asyncio.run(main.main(early_stop=True, num_runs=40, ci_width=0.3, max_concurrency=5))
+
+    # 0.3 settles after 9 passes, but the 10th finished alongside the 9th
+    out = capsys.readouterr().out
+    assert out.count("✓ Run") == 10
+    assert "Stopped early after 10/40 runs" in out
+    assert "Passed: 10/10" in out
+
+
+def test_concurrent_early_stop_counts_every_finished_run(mock_api, capsys):
+    asyncio.run(main.main(early_stop=True, num_runs=40, ci_width=0.3, max_concurrency=5))
+
+    out = capsys.readouterr().out
+    stopped = re.search(r"Stopped early after (\d+)/40 runs", out)
+    assert stopped is not None
+    completed = int(stopped.group(1))
+    assert completed >= main.min_runs_for_ci_width(0.3)
+    # Runs that finished while the stop was decided are reported, not dropped
+    assert out.count("✓ Run") == completed
+    assert f"Passed: {completed}/{completed}" in out
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "import sys; sys.stdout.write('hi\\n')",
+        "import sys; print('hi', file=sys.stdout)",
+        "print('hi')",
+    ],
+)
+def test_python_expression_captures_stdout(expression, capsys):
+    assert main.python_expression_tool(expression) == {"result": "hi\n", "error": None}
+    assert capsys.readouterr().out == ""
+
+    async def sandboxed():
+        pool = main.SandboxPool(size=1)
+        try:
+            return await pool.run(expression)
+        finally:
+            pool.close()
+
+    assert asyncio.run(sandboxed()) == {"result": "hi\n", "error": None}